@@ -215,6 +215,12 @@ def run_pipeline(
         os.makedirs('data/processed', exist_ok=True)
         predictions_df.to_csv('data/processed/student_predictions.csv', index=False)
         logger.info("Saved predictions to data/processed/student_predictions.csv")
+        try:
+            # Columnar copy for the dashboard; needs pyarrow or fastparquet
+            predictions_df.to_parquet('data/processed/student_predictions.parquet', index=False)
+            logger.info("Saved predictions to data/processed/student_predictions.parquet")
+        except (ImportError, ValueError, TypeError, OSError) as e:
+            logger.warning(f"Could not save Parquet predictions: {e}")
     
     # ===== Pipeline Complete =====
     logger.info("\n" + "="*80)
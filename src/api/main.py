@@ -5,12 +5,20 @@ Provides REST API endpoints for the Next.js frontend
 
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List
+import asyncio
 import sys
 import os
 import requests
 import base64
+import json
+import logging
+import re
+import sqlite3
+from functools import lru_cache
+from itertools import islice
 
 # Add project root to path (for absolute imports)
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -18,9 +26,13 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from src.database.models import get_db
-from src.chatbot.rag_system import RAGSystem
+from src.chatbot.rag_system import get_rag_system
 from src.prescriptive.llm_advisor import LLMAdvisor
 
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+
 app = FastAPI(title="PLAF LMS API", version="1.0.0")
 
 # CORS configuration for Next.js frontend
@@ -37,15 +49,25 @@ db = get_db()
 rag_system = None
 llm_advisor = None
 
+def _init_rag_system():
+    """Load (or build) the knowledge base; /api/chat answers 503 until it is ready"""
+    global rag_system
+    try:
+        rag_system = get_rag_system()
+    except Exception as e:
+        print(f"Warning: RAG system not initialized: {e}")
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize AI services on startup"""
-    global rag_system, llm_advisor
+    global llm_advisor
     try:
-        rag_system = RAGSystem()
         llm_advisor = LLMAdvisor()
     except Exception as e:
         print(f"Warning: AI services not initialized: {e}")
+    # Building the index embeds every course; run it in a worker thread so the
+    # event loop starts serving requests straight away
+    asyncio.get_running_loop().run_in_executor(None, _init_rag_system)
 
 # Request/Response Models
 class LoginRequest(BaseModel):
@@ -880,9 +902,29 @@ async def upload_image(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 # ==================== Admin Course Management ====================
+# DB-bound admin/intervention endpoints are plain `def` so FastAPI runs them in
+# its threadpool instead of blocking the event loop on SQLite I/O.
+
+@app.get("/api/admin/courses")
+def list_admin_courses():
+    """Admin: List courses with their lesson counts in one query"""
+    try:
+        conn = db.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT c.*, COUNT(l.id) AS lessons_count
+            FROM courses c
+            LEFT JOIN lessons l ON l.course_id = c.id
+            GROUP BY c.id
+            ORDER BY c.created_at DESC
+        """)
+        courses = [dict(row) for row in cursor.fetchall()]
+        return {"courses": courses}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/admin/courses")
-async def create_course(course_data: CourseCreate):
+def create_course(course_data: CourseCreate):
     """Admin: Create a new course"""
     try:
         conn = db.connect()
@@ -891,9 +933,8 @@ async def create_course(course_data: CourseCreate):
         # Auto-generate unique course_code if not provided
         course_code = course_data.course_code
         if not course_code:
-            import re, random
             # Build initial code from title initials (e.g., Machine Learning Fundamentals -> MLF)
-            initials = ''.join([w[0] for w in re.findall(r"[A-Za-z0-9]+", course_data.title)])[:6].upper()
+            initials = ''.join(m[0][0] for m in islice(_WORD_RE.finditer(course_data.title), 6)).upper()
             base = initials or "COURSE"
             # Ensure uniqueness by checking existing records
             attempt = 0
@@ -924,28 +965,33 @@ async def create_course(course_data: CourseCreate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+COURSE_UPDATE_FIELDS = (
+    "title", "description", "thumbnail_url", "instructor_name", "instructor_title",
+    "duration_hours", "level", "category", "code_module", "course_code",
+)
+
+@lru_cache(maxsize=None)
+def _build_course_update_sql(fields: tuple) -> str:
+    """Build (and cache) the UPDATE statement for a given set of course fields"""
+    return f"UPDATE courses SET {', '.join(f'{f} = ?' for f in fields)} WHERE id = ?"
+
 @app.put("/api/admin/courses/{course_id}")
-async def update_course(course_id: int, course_data: CourseUpdate):
+def update_course(course_id: int, course_data: CourseUpdate):
     """Admin: Update a course"""
     try:
         conn = db.connect()
         cursor = conn.cursor()
         
-        # Build dynamic update query
-        updates = []
-        values = []
+        # Only whitelisted fields that were explicitly sent are updated
+        fields = tuple(f for f in COURSE_UPDATE_FIELDS if f in course_data.model_fields_set)
         
-        for field, value in course_data.dict(exclude_unset=True).items():
-            updates.append(f"{field} = ?")
-            values.append(value)
-        
-        if not updates:
+        if not fields:
             raise HTTPException(status_code=400, detail="No fields to update")
         
+        values = [getattr(course_data, f) for f in fields]
         values.append(course_id)
-        query = f"UPDATE courses SET {', '.join(updates)} WHERE id = ?"
         
-        cursor.execute(query, values)
+        cursor.execute(_build_course_update_sql(fields), values)
         
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Course not found")
@@ -958,7 +1004,7 @@ async def update_course(course_id: int, course_data: CourseUpdate):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/admin/courses/{course_id}")
-async def delete_course(course_id: int):
+def delete_course(course_id: int):
     """Admin: Delete a course"""
     try:
         conn = db.connect()
@@ -1004,7 +1050,7 @@ class InterventionResponse(BaseModel):
     timestamp: str
 
 @app.post("/api/interventions/trigger")
-async def trigger_intervention(request: InterventionRequest):
+def trigger_intervention(request: InterventionRequest):
     """
     Trigger a proactive intervention for a student
     Implementation of Proactive Intervention from SYSTEM_IMPROVEMENT_ANALYSIS.md
@@ -1030,19 +1076,21 @@ async def trigger_intervention(request: InterventionRequest):
         intervention_id = cursor.lastrowid
         
         # Generate intervention strategy based on risk level and student data
+        # Only project the columns the strategy needs (id_student is the primary key)
         student_data = cursor.execute("""
-            SELECT * FROM students WHERE id_student = ?
+            SELECT risk_probability, avg_score, num_days_active
+            FROM students WHERE id_student = ?
         """, (request.student_id,)).fetchone()
         
         if not student_data:
             raise HTTPException(status_code=404, detail="Student not found")
         
-        # Convert Row to dict
-        student_dict = dict(student_data)
+        risk_probability, avg_score, num_days_active = student_data
         
         # Create intervention response based on risk level
         intervention_strategy = generate_intervention_strategy(
-            student_dict, request.risk_level, request.intervention_type
+            risk_probability, avg_score, num_days_active,
+            request.risk_level, request.intervention_type
         )
         
         conn.commit()
@@ -1059,29 +1107,48 @@ async def trigger_intervention(request: InterventionRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+MAX_INTERVENTIONS_LIMIT = 1000
+
+def _stream_interventions(cursor):
+    """Yield the interventions JSON payload one row at a time.
+    
+    The 200 status is already sent when rows start streaming, so a database error
+    mid-way closes the list and reports it in an "error" field instead.
+    """
+    yield b'{"interventions":['
+    try:
+        for i, row in enumerate(cursor):
+            if i:
+                yield b','
+            yield json.dumps(dict(row), default=str).encode('utf-8')
+    except sqlite3.Error as e:
+        logger.error(f"Interventions stream aborted: {e}")
+        yield b'],"error":' + json.dumps(str(e)).encode('utf-8') + b'}'
+        return
+    yield b']}'
+
 @app.get("/api/interventions/student/{student_id}")
-async def get_student_interventions(student_id: int, limit: int = 10):
+def get_student_interventions(student_id: int, limit: int = 10):
     """Get intervention history for a student"""
     try:
         conn = db.connect()
         cursor = conn.cursor()
         
-        interventions = cursor.execute("""
+        # Iterate the cursor lazily instead of materializing every row
+        cursor.execute("""
             SELECT * FROM intervention_logs 
             WHERE student_id = ? 
             ORDER BY created_at DESC 
             LIMIT ?
-        """, (student_id, limit)).fetchall()
+        """, (student_id, max(1, min(limit, MAX_INTERVENTIONS_LIMIT))))
         
-        return {
-            "interventions": [dict(row) for row in interventions]
-        }
+        return StreamingResponse(_stream_interventions(cursor), media_type="application/json")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/interventions/feedback")
-async def record_intervention_feedback(
+def record_intervention_feedback(
     intervention_id: int,
     effectiveness: int,  # 1-5 scale
     student_response: str,
@@ -1109,14 +1176,14 @@ async def record_intervention_feedback(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def generate_intervention_strategy(student_data, risk_level: str, intervention_type: str) -> Dict:
+def generate_intervention_strategy(risk_probability: Optional[float], avg_score: Optional[float],
+                                   num_days_active: Optional[int], risk_level: str,
+                                   intervention_type: str) -> Dict:
     """
     Generate intervention strategy based on student data and risk level
     Implementation of Multi-Level Intervention from SYSTEM_IMPROVEMENT_ANALYSIS.md
     """
-    risk_probability = student_data.get('risk_probability', 0)
-    avg_score = student_data.get('avg_score', 0)
-    num_days_active = student_data.get('num_days_active', 0)
+    risk_probability = risk_probability or 0
     
     strategies = []
     
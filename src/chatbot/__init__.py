@@ -1,6 +1,6 @@
 """Chatbot module with RAG system."""
 
-from .rag_system import RAGSystem, initialize_knowledge_base
+from .rag_system import RAGSystem, initialize_knowledge_base, get_rag_system
 
-__all__ = ['RAGSystem', 'initialize_knowledge_base']
+__all__ = ['RAGSystem', 'initialize_knowledge_base', 'get_rag_system']
 
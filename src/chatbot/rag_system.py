@@ -5,10 +5,19 @@ Uses FAISS for vector similarity search and Gemini for generation.
 """
 
 import numpy as np
-from typing import List, Dict, Tuple
+import scipy.sparse as sp
+from typing import List, Dict, Optional, Tuple
+import hashlib
 import logging
 import os
 import pickle
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 from dotenv import load_dotenv
 
@@ -25,16 +34,64 @@ except ImportError:
     logger.warning("FAISS not available. Install with: pip install faiss-cpu")
     FAISS_AVAILABLE = False
 
+EMBEDDING_MODEL = "models/text-embedding-004"
+EMBEDDING_DIM = 768
+EMBED_BATCH_SIZE = 100
+EMBED_MAX_RETRIES = 3
+EMBED_MAX_WORKERS = 8  # Bounded to stay under the Gemini rate limit
+QUERY_CACHE_SIZE = 10000
+QUERY_EMBEDDING_CACHE_SIZE = 512
+QUERY_CACHE_THRESHOLD = 0.95  # Cosine similarity for a semantic cache hit
+# Bumped whenever the saved index layout changes (metric, normalization, id mapping);
+# indexes saved with another format are rebuilt instead of loaded
+RAG_INDEX_FORMAT = 2
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+# Static prompt sections, identical for every chat request
+_PROMPT_HEADER = "You are an experienced AI academic advisor helping students succeed in their online learning journey. You have access to comprehensive data about this student's learning behavior, progress, and performance."
+_PROMPT_INSTRUCTIONS = """=== INSTRUCTIONS ===
+Based on the student's complete profile above, provide:
+1. A personalized, data-driven response that references their specific situation
+2. Concrete, actionable advice tailored to their progress and performance
+3. Encouragement and motivation appropriate to their current status
+4. Specific next steps they should take
+
+If the student is at-risk, be especially supportive and provide clear guidance on improvement.
+If they're doing well, acknowledge their progress and suggest ways to maintain momentum.
+Reference specific metrics from their profile when relevant (e.g., "I see you've completed X lessons...").
+
+Keep the response conversational, encouraging, and focused (2-3 paragraphs).
+Respond in plain text only. Do not emit HTML tags.
+
+Response:"""
+
+ERROR_RESPONSE = "I'm sorry, I encountered an error. Please try asking your question again."
+
+# One pool for every Gemini embedding batch in the process, so concurrent
+# create_semantic_embeddings calls share the EMBED_MAX_WORKERS bound
+# (threads are only started as batches are submitted)
+_EMBED_EXECUTOR = ThreadPoolExecutor(max_workers=EMBED_MAX_WORKERS, thread_name_prefix="gemini-embed")
+
+
+def _l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place so inner product equals cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # Leave zero (failed) embeddings untouched
+    vectors /= norms
+    return vectors
+
 
 class RAGSystem:
     """RAG system for student chatbot."""
     
-    def __init__(self, api_key: str = None, knowledge_base_path: str = "data/knowledge_base.pkl", index_path: str = "data/faiss_index.faiss"):
+    def __init__(self, api_key: str = None, knowledge_base_path: str = "data/knowledge_base.pkl", index_path: str = "data/faiss_index.faiss", nprobe: int = 8, embed_cache_path: str = "data/embed_cache.sqlite"):
         """
         Initialize RAG system.
         
         Args:
             api_key: Gemini API key
+            nprobe: Number of IVF lists probed per search (ignored for flat indexes)
+            embed_cache_path: SQLite file caching document embeddings by content hash
         """
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         
@@ -43,30 +100,206 @@ class RAGSystem:
         
         # Configure Gemini
         genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-        self.embedding_model = genai.GenerativeModel('text-embedding-004') if hasattr(genai, 'text_embedding_004') else None
+        self.model = genai.GenerativeModel(
+            'gemini-2.5-flash',
+            generation_config={'temperature': 0.3}
+        )
         
         # Knowledge base
         self.documents = []
+        self.doc_ids = []  # Stable int64 ids, parallel to self.documents
+        self._doc_positions = {}  # doc id -> position in self.documents
+        self._next_doc_id = 0
         self.embeddings = None
         self.index = None
+        self.vectorizer = None  # Set when the index is built with the hashing fallback
+        self.nprobe = nprobe
+        self.embed_cache_path = embed_cache_path
+        
+        # Semantic cache of chat responses, searched by query embedding
+        self.query_cache_index = None
+        self.query_cache = OrderedDict()  # cache id -> (context key, result), in LRU order
+        self._next_query_cache_id = 0
+        self._query_embeddings = OrderedDict()  # query text -> Gemini embedding, in LRU order
+        # One instance serves every session thread; guards the two caches above
+        self._cache_lock = threading.Lock()
         
         logger.info("RAG System initialized")
     
-    def add_documents(self, documents: List[str]):
+    def add_documents(self, documents: List[str]) -> List[int]:
         """
         Add documents to knowledge base.
         
+        If the index has already been built, only the new documents are
+        embedded and added to it.
+        
         Args:
             documents: List of text documents
+            
+        Returns:
+            Ids assigned to the documents
         """
+        ids = list(range(self._next_doc_id, self._next_doc_id + len(documents)))
+        self._next_doc_id += len(documents)
+        for doc_id in ids:
+            self._doc_positions[doc_id] = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
         self.documents.extend(documents)
         logger.info(f"Added {len(documents)} documents to knowledge base")
+        
+        if self.embeddings is not None and documents:
+            self._index_new_documents(documents, ids)
+        return ids
+    
+    def _index_new_documents(self, documents: List[str], ids: List[int]):
+        """Embed newly added documents and append them to an existing index."""
+        if self.vectorizer is not None:
+            new_embeddings = self.create_simple_embeddings(documents)
+            self.embeddings = sp.vstack([self.embeddings, new_embeddings], format='csr')
+            vectors = new_embeddings.toarray()
+        else:
+            vectors = self.create_semantic_embeddings(documents).astype('float32')
+            self.embeddings = np.vstack([self.embeddings, vectors.astype(np.float16)])
+        
+        if self.index is not None:
+            self.index.add_with_ids(vectors, np.array(ids, dtype='int64'))
+    
+    def remove_documents(self, ids: List[int]):
+        """
+        Remove documents from the knowledge base.
+        
+        The index drops them in place; only IVF FastScan indexes, whose
+        inverted lists do not support removal, are rebuilt from the stored
+        embeddings.
+        
+        Args:
+            ids: Document ids returned by add_documents
+        """
+        remove = set(ids) & self._doc_positions.keys()
+        if not remove:
+            return
+        
+        rebuild = False
+        if self.index is not None:
+            try:
+                self.index.remove_ids(np.array(sorted(remove), dtype='int64'))
+            except RuntimeError:
+                # FastScan's block inverted lists cannot remove entries in place
+                rebuild = True
+        
+        keep = [pos for pos, doc_id in enumerate(self.doc_ids) if doc_id not in remove]
+        self.documents = [self.documents[pos] for pos in keep]
+        self.doc_ids = [self.doc_ids[pos] for pos in keep]
+        if self.embeddings is not None:
+            self.embeddings = self.embeddings[keep]
+        self._doc_positions = {doc_id: pos for pos, doc_id in enumerate(self.doc_ids)}
+        logger.info(f"Removed {len(remove)} documents from knowledge base")
+        
+        if rebuild:
+            logger.info("Index does not support removal; rebuilding it from the stored embeddings")
+            self.index = None
+            if self.documents:
+                self.build_index(self.embeddings)
+    
+    def _get_cached_embeddings(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Look up document embeddings in the on-disk cache by content hash."""
+        cached = {}
+        try:
+            conn = sqlite3.connect(self.embed_cache_path)
+            try:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS embeddings (
+                        model TEXT NOT NULL,
+                        hash TEXT NOT NULL,
+                        vec BLOB NOT NULL,
+                        PRIMARY KEY (model, hash)
+                    )
+                """)
+                unique_keys = list(set(keys))
+                # Stay under SQLite's bound-parameter limit
+                for start in range(0, len(unique_keys), 500):
+                    chunk = unique_keys[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT hash, vec FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                        [EMBEDDING_MODEL, *chunk]
+                    )
+                    for key, blob in rows:
+                        cached[key] = np.frombuffer(blob, dtype='float32')
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Could not read embedding cache: {e}")
+        return cached
+    
+    def _put_cached_embeddings(self, items: List[Tuple[str, np.ndarray]]):
+        """Store document embeddings in the on-disk cache."""
+        if not items:
+            return
+        try:
+            conn = sqlite3.connect(self.embed_cache_path)
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, hash, vec) VALUES (?, ?, ?)",
+                    [(EMBEDDING_MODEL, key, np.asarray(vec, dtype='float32').tobytes()) for key, vec in items]
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Could not write embedding cache: {e}")
+    
+    def _embed_batch(self, batch: List[str], offset: int = 0) -> List:
+        """
+        Embed a batch of documents with a single Gemini request.
+        
+        Retries with exponential backoff; if the batch keeps failing, falls
+        back to per-document requests for this batch only.
+        
+        Args:
+            batch: Texts to embed
+            offset: Index of the first text (for log messages)
+            
+        Returns:
+            List of embeddings, in input order
+        """
+        for attempt in range(EMBED_MAX_RETRIES):
+            # Jitter so concurrent batches don't hit the API in lockstep
+            time.sleep(random.uniform(0, 0.05))
+            try:
+                result = genai.embed_content(
+                    model=EMBEDDING_MODEL,
+                    content=batch,
+                    task_type="retrieval_document"
+                )
+                return result['embedding']
+            except Exception as e:
+                logger.warning(f"Embedding batch at {offset} failed (attempt {attempt + 1}/{EMBED_MAX_RETRIES}): {e}")
+                if attempt < EMBED_MAX_RETRIES - 1:
+                    time.sleep(2 ** attempt)
+        
+        embeddings = []
+        for i, text in enumerate(batch):
+            try:
+                result = genai.embed_content(
+                    model=EMBEDDING_MODEL,
+                    content=text,
+                    task_type="retrieval_document"
+                )
+                embeddings.append(result['embedding'])
+            except Exception as e:
+                logger.error(f"Error creating embedding for text {offset + i}: {e}")
+                # Fallback to simple zero embedding
+                embeddings.append(np.zeros(EMBEDDING_DIM))
+        return embeddings
     
     def create_semantic_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Create semantic embeddings using Gemini embedding model.
         
+        Embeddings are cached on disk by (model, sha256(text)), so only texts
+        not seen before are sent to Gemini.
+        
         Args:
             texts: List of texts
             
@@ -74,71 +307,108 @@ class RAGSystem:
             Embeddings matrix (numpy array)
         """
         logger.info(f"Creating semantic embeddings for {len(texts)} documents...")
-        embeddings = []
         
         try:
-            # Use Gemini embedding model
-            for i, text in enumerate(texts):
-                if i % 10 == 0:
-                    logger.info(f"Processing embedding {i+1}/{len(texts)}")
-                
-                try:
-                    # Use Gemini embedding API
-                    result = genai.embed_content(
-                        model="models/text-embedding-004",
-                        content=text,
-                        task_type="retrieval_document"
-                    )
-                    embedding = result['embedding']
-                    embeddings.append(embedding)
-                except Exception as e:
-                    logger.error(f"Error creating embedding for text {i}: {e}")
-                    # Fallback to simple zero embedding
-                    embeddings.append(np.zeros(768))
+            keys = [hashlib.sha256(text.encode('utf-8')).hexdigest() for text in texts]
+            cached = self._get_cached_embeddings(keys)
+            
+            # Fill a preallocated float32 matrix in place instead of converting a list of lists
+            embeddings = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+            misses = []
+            for i, key in enumerate(keys):
+                if key in cached:
+                    embeddings[i] = cached[key]
+                else:
+                    misses.append(i)
+            miss_texts = [texts[i] for i in misses]
+            logger.info(f"Embedding cache: {len(texts) - len(misses)} hits, {len(misses)} misses")
+            
+            # Use Gemini embedding model, one request per batch, batches in parallel on the shared pool
+            futures = [
+                (start, _EMBED_EXECUTOR.submit(self._embed_batch, miss_texts[start:start + EMBED_BATCH_SIZE], start))
+                for start in range(0, len(miss_texts), EMBED_BATCH_SIZE)
+            ]
+            for start, future in futures:
+                batch_embeddings = future.result()
+                for j, emb in enumerate(batch_embeddings):
+                    embeddings[misses[start + j]] = emb
+                logger.info(f"Processed embeddings {start+1}-{start + len(batch_embeddings)}/{len(miss_texts)}")
             
-            embeddings = np.array(embeddings, dtype='float32')
+            # Zero vectors are failed requests and must not be cached
+            self._put_cached_embeddings([
+                (keys[i], embeddings[i]) for i in misses if np.any(embeddings[i])
+            ])
+            
+            _l2_normalize(embeddings)
             logger.info(f"Created {len(embeddings)} embeddings with shape {embeddings.shape}")
             return embeddings
             
         except Exception as e:
-            logger.warning(f"Failed to create semantic embeddings: {e}. Using fallback TF-IDF.")
+            logger.warning(f"Failed to create semantic embeddings: {e}. Using fallback hashed embeddings.")
             return self.create_simple_embeddings(texts)
     
+    @staticmethod
+    def _make_vectorizer():
+        """Create the stateless hashing vectorizer used by the fallback embeddings."""
+        from sklearn.feature_extraction.text import HashingVectorizer
+        
+        return HashingVectorizer(n_features=512, alternate_sign=False, norm='l2')
+    
     def create_simple_embeddings(self, texts: List[str]) -> np.ndarray:
         """
-        Create simple TF-IDF-like embeddings (fallback if no embedding model).
+        Create simple hashed bag-of-words embeddings (fallback if no embedding model).
+        
+        The hashing vectorizer needs no fit and no vocabulary, so it does not
+        have to be persisted with the index. The result stays sparse; it is
+        only densified when handed to FAISS.
         
         Args:
             texts: List of texts
             
         Returns:
-            Embeddings matrix
+            Sparse CSR embeddings matrix (float32)
         """
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        
-        vectorizer = TfidfVectorizer(max_features=384)
-        embeddings = vectorizer.fit_transform(texts).toarray()
+        if self.vectorizer is None:
+            self.vectorizer = self._make_vectorizer()
         
-        self.vectorizer = vectorizer
-        return embeddings.astype('float32')
+        return sp.csr_matrix(self.vectorizer.transform(texts), dtype=np.float32)
     
-    def build_index(self):
-        """Build FAISS index for fast similarity search."""
+    def build_index(self, embeddings=None):
+        """
+        Build FAISS index for fast similarity search.
+        
+        Args:
+            embeddings: Precomputed embeddings for self.documents (computed if omitted)
+        """
         if not self.documents:
             logger.warning("No documents to index")
             return
         
-        # Create semantic embeddings
-        logger.info("Creating semantic embeddings...")
-        self.embeddings = self.create_semantic_embeddings(self.documents)
+        if embeddings is not None:
+            self.embeddings = embeddings
+        else:
+            # Create semantic embeddings
+            logger.info("Creating semantic embeddings...")
+            self.embeddings = self.create_semantic_embeddings(self.documents)
         
         # Build FAISS index for fast search
         if FAISS_AVAILABLE:
             try:
-                dimension = self.embeddings.shape[1]
-                # Use IndexFlatL2 for exact search (can upgrade to IndexIVFFlat for approximate search with large datasets)
-                self.index = faiss.IndexFlatL2(dimension)
-                self.index.add(self.embeddings.astype('float32'))
+                if sp.issparse(self.embeddings):
+                    vectors = self.embeddings.toarray()
+                else:
+                    vectors = self.embeddings.astype('float32')
+                base_index = self._create_faiss_index(vectors.shape[1], len(vectors))
+                if not base_index.is_trained:
+                    base_index.train(vectors)
+                # Map FAISS results to stable document ids so documents can be removed later.
+                # IVF indexes store ids in their inverted lists; IndexIDMap2 would assume the
+                # base index renumbers vectors on removal, which IVF does not.
+                if faiss.try_extract_index_ivf(base_index) is not None:
+                    self.index = base_index
+                else:
+                    self.index = faiss.IndexIDMap2(base_index)
+                self.index.add_with_ids(vectors, np.array(self.doc_ids, dtype='int64'))
                 logger.info(f"Built FAISS index with {self.index.ntotal} vectors")
             except Exception as e:
                 logger.warning(f"Failed to build FAISS index: {e}. Using simple search.")
@@ -146,62 +416,118 @@ class RAGSystem:
         else:
             logger.warning("FAISS not available. Using simple search.")
             self.index = None
+        
+        # Keep a half-precision copy of dense embeddings for the fallback search and the saved index
+        if not sp.issparse(self.embeddings):
+            self.embeddings = np.ascontiguousarray(self.embeddings, dtype=np.float16)
     
-    def search(self, query: str, top_k: int = 3) -> List[Tuple[str, float]]:
+    @staticmethod
+    def _create_faiss_index(dimension: int, num_vectors: int):
         """
-        Search for relevant documents using FAISS (if available) or simple search.
+        Create an (untrained) FAISS index sized for the knowledge base.
+        
+        Both variants use inner product over L2-normalized vectors (cosine).
+        Large knowledge bases use IVF + 4-bit PQ FastScan, which scans only
+        `nprobe` inverted lists of compressed codes. Small ones, where the
+        coarse quantizer cannot be trained reliably, use an exhaustive scan
+        over fp16 scalar-quantized codes.
+        """
+        nlist, pq_m = (1024, 64) if num_vectors >= 100_000 else (256, 32)
+        if num_vectors < 10 * nlist or dimension % pq_m != 0:
+            return faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+        
+        return faiss.index_factory(dimension, f"IVF{nlist},PQ{pq_m}x4fs", faiss.METRIC_INNER_PRODUCT)
+    
+    def _embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a query in the same space the index was built in.
+        
+        Gemini query embeddings are memoized per query text, so repeated
+        queries skip the network round-trip.
         
-        Args:
-            query: Search query
-            top_k: Number of results
-            
         Returns:
-            List of (document, score) tuples
+            Normalized (1, dim) float32 embedding, or None if embedding failed
         """
-        if not self.documents:
-            return []
+        if self.vectorizer is not None:
+            return self.vectorizer.transform([query]).toarray().astype('float32')
+        
+        with self._cache_lock:
+            query_embedding = self._query_embeddings.get(query)
+            if query_embedding is not None:
+                self._query_embeddings.move_to_end(query)
+                return query_embedding
         
-        # Create query embedding
         try:
             # Use semantic embedding for query
             result = genai.embed_content(
-                model="models/text-embedding-004",
+                model=EMBEDDING_MODEL,
                 content=query,
                 task_type="retrieval_query"
             )
-            query_embedding = np.array([result['embedding']], dtype='float32')
+            query_embedding = _l2_normalize(np.array([result['embedding']], dtype='float32'))
             logger.info(f"Created query embedding with shape {query_embedding.shape}")
+            
+            with self._cache_lock:
+                self._query_embeddings[query] = query_embedding
+                if len(self._query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+                    self._query_embeddings.popitem(last=False)
+            return query_embedding
         except Exception as e:
             logger.warning(f"Failed to create semantic embedding for query: {e}")
-            # Fallback
-        if hasattr(self, 'vectorizer') and self.vectorizer is not None:
-            query_embedding = self.vectorizer.transform([query]).toarray().astype('float32')
-        else:
-            query_embedding = self.create_simple_embeddings([query])
+            return None
+    
+    def search(self, query: str, top_k: int = 3, query_embedding: np.ndarray = None) -> List[Tuple[str, float]]:
+        """
+        Search for relevant documents using FAISS (if available) or simple search.
+        
+        Args:
+            query: Search query
+            top_k: Number of results
+            query_embedding: Precomputed query embedding (computed if omitted)
+            
+        Returns:
+            List of (document, score) tuples
+        """
+        if not self.documents:
+            return []
+        
+        if query_embedding is None:
+            query_embedding = self._embed_query(query)
+            if query_embedding is None:
+                return []
         
         # Use FAISS for fast similarity search
         if self.index is not None:
             try:
                 # Search using FAISS
                 k = min(top_k, len(self.documents))
-                distances, indices = self.index.search(query_embedding, k)
+                ivf = faiss.try_extract_index_ivf(self.index)
+                if ivf is not None:
+                    ivf.nprobe = self.nprobe
+                # Embeddings are L2-normalized, so inner product is cosine similarity
+                similarities, indices = self.index.search(query_embedding, k)
                 
                 results = []
-                for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-                    if idx < len(self.documents):
-                        # Convert L2 distance to similarity score (1 / (1 + distance))
-                        similarity = 1.0 / (1.0 + distance)
-                        results.append((self.documents[idx], float(similarity)))
+                for similarity, doc_id in zip(similarities[0], indices[0]):
+                    pos = self._doc_positions.get(int(doc_id))
+                    if pos is not None:
+                        results.append((self.documents[pos], float(similarity)))
                 
                 logger.info(f"FAISS search returned {len(results)} results")
                 return results
             except Exception as e:
                 logger.warning(f"FAISS search failed: {e}. Using fallback search.")
         
-        # Fallback: Use simple cosine similarity
-        from sklearn.metrics.pairwise import cosine_similarity
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        # Fallback: embeddings and query are L2-normalized, so a dot product is cosine similarity
+        if sp.issparse(self.embeddings):
+            similarities = self.embeddings @ query_embedding[0]
+        else:
+            similarities = self.embeddings.astype(np.float32, copy=False) @ query_embedding[0]
+        if top_k < len(similarities):
+            top_indices = np.argpartition(-similarities, top_k)[:top_k]
+            top_indices = top_indices[np.argsort(-similarities[top_indices])]
+        else:
+            top_indices = np.argsort(-similarities)
         
         results = []
         for idx in top_indices:
@@ -238,13 +564,13 @@ class RAGSystem:
             has_oulad_data = stats.get('has_oulad_data', False)
             
             # Basic info
-            student_info = f"""
+            parts = [f"""
 === STUDENT PROFILE ===
 Name: {student.get('first_name', '')} {student.get('last_name', '')}
 Email: {student.get('email', '')}
 Student ID: {student.get('id_student', 'N/A')}
 Course Module: {student.get('code_module', 'N/A')}
-"""
+"""]
             
             if has_oulad_data:
                 # Use OULAD data (real academic performance data)
@@ -254,7 +580,7 @@ Course Module: {student.get('code_module', 'N/A')}
                 total_engagement = stats.get('total_engagement', 0)
                 is_at_risk = stats.get('is_at_risk', 0)
                 
-                student_info += f"""
+                parts.append(f"""
 === ACADEMIC PERFORMANCE (OULAD Data) ===
 Risk Level: {risk_prob:.1f}% ({'HIGH RISK - Needs Attention' if is_at_risk else 'On Track'})
 Average Score: {avg_score:.1f}% ({'Excellent' if avg_score >= 80 else 'Good' if avg_score >= 60 else 'Needs Improvement'})
@@ -265,19 +591,19 @@ Total Interactions: {total_engagement:,} clicks ({'Very Active' if total_engagem
 Academic Status: {'At-Risk Student - Requires Support' if is_at_risk else 'Performing Well'}
 Engagement Level: {'High' if days_active >= 40 and total_engagement >= 1000 else 'Moderate' if days_active >= 20 else 'Low'}
 Performance Trend: {'Strong Performance' if avg_score >= 70 else 'Needs Academic Support'}
-"""
+""")
             else:
                 # Use course enrollment data
-                student_info += f"""
+                parts.append(f"""
 === CURRENT LEARNING STATUS ===
 Enrolled Courses: {stats.get('total_courses', 0)}
 Total Lessons: {stats.get('total_lessons', 0)}
 Completed Lessons: {stats.get('completed_lessons', 0)}
 Overall Progress: {stats.get('course_progress', 0):.1f}%
-"""
+""")
             
             # Always show quiz and forum data if available
-            student_info += f"""
+            parts.append(f"""
 === QUIZ PERFORMANCE ===
 Total Quizzes Taken: {stats.get('total_quizzes', 0)}
 Quizzes Passed: {stats.get('passed_quizzes', 0)}
@@ -285,23 +611,25 @@ Average Quiz Score: {stats.get('quiz_avg_score', 0):.1f}%
 
 === FORUM ACTIVITY ===
 Forum Posts Created: {stats.get('forum_activity', 0)}
-"""
+""")
             
             # Add current courses details
             if courses:
-                student_info += "\n=== ENROLLED COURSES ===\n"
+                parts.append("\n=== ENROLLED COURSES ===\n")
                 for course in courses:
                     completed = course.get('completed_lessons', 0) or 0
                     total = course.get('total_lessons', 0) or 0
                     progress = (completed / total * 100) if total > 0 else 0
-                    student_info += f"- {course.get('course_title', 'N/A')}: {completed}/{total} lessons ({progress:.1f}% complete)\n"
+                    parts.append(f"- {course.get('course_title', 'N/A')}: {completed}/{total} lessons ({progress:.1f}% complete)\n")
             
             # Add recent quiz results
             if quiz_results:
-                student_info += "\n=== RECENT QUIZ RESULTS ===\n"
+                parts.append("\n=== RECENT QUIZ RESULTS ===\n")
                 for quiz in quiz_results[:3]:  # Show last 3 quizzes
                     status = "✅ PASSED" if quiz.get('passed') else "❌ FAILED"
-                    student_info += f"- {quiz.get('course_title', 'N/A')} - {quiz.get('title', 'Quiz')}: {quiz.get('score', 0):.1f}% {status}\n"
+                    parts.append(f"- {quiz.get('course_title', 'N/A')} - {quiz.get('title', 'Quiz')}: {quiz.get('score', 0):.1f}% {status}\n")
+            
+            student_info = "".join(parts)
         
         elif student_data:
             # Fallback to basic student data
@@ -323,7 +651,7 @@ Risk Level: {student_data.get('risk_probability', 0)*100:.1f}%
 Use this context to provide more personalized and consistent advice. Reference previous discussions when relevant.
 """
         
-        prompt = f"""You are an experienced AI academic advisor helping students succeed in their online learning journey. You have access to comprehensive data about this student's learning behavior, progress, and performance.
+        prompt = f"""{_PROMPT_HEADER}
 
 {student_info}
 
@@ -335,33 +663,20 @@ Use this context to provide more personalized and consistent advice. Reference p
 === STUDENT QUESTION ===
 {query}
 
-=== INSTRUCTIONS ===
-Based on the student's complete profile above, provide:
-1. A personalized, data-driven response that references their specific situation
-2. Concrete, actionable advice tailored to their progress and performance
-3. Encouragement and motivation appropriate to their current status
-4. Specific next steps they should take
-
-If the student is at-risk, be especially supportive and provide clear guidance on improvement.
-If they're doing well, acknowledge their progress and suggest ways to maintain momentum.
-Reference specific metrics from their profile when relevant (e.g., "I see you've completed X lessons...").
-
-Keep the response conversational, encouraging, and focused (2-3 paragraphs).
-
-Response:"""
+{_PROMPT_INSTRUCTIONS}"""
         
         try:
             response = self.model.generate_content(prompt)
             response_text = response.text
             
-            # Strip any HTML tags that might be in the response
-            import re
-            response_text = re.sub(r'<[^>]+>', '', response_text)
+            # The prompt asks for plain text; strip any HTML tags that slip through
+            if '<' in response_text:
+                response_text = _HTML_TAG_RE.sub('', response_text)
             
             return response_text
         except Exception as e:
             logger.error(f"Error generating response: {e}")
-            return "I'm sorry, I encountered an error. Please try asking your question again."
+            return ERROR_RESPONSE
     
     def query(self, query: str, student_context: Dict = None, top_k: int = 3) -> str:
         """
@@ -378,6 +693,41 @@ Response:"""
         result = self.chat(query, student_data=student_context, top_k=top_k)
         return result['response']
     
+    def _lookup_query_cache(self, query_embedding: np.ndarray, context_key: str) -> Dict:
+        """Return a cached chat result for a near-duplicate query in the same context."""
+        with self._cache_lock:
+            if self.query_cache_index is None or self.query_cache_index.ntotal == 0:
+                return None
+            
+            k = min(8, self.query_cache_index.ntotal)
+            similarities, ids = self.query_cache_index.search(query_embedding, k)
+            for similarity, cache_id in zip(similarities[0], ids[0]):
+                if similarity < QUERY_CACHE_THRESHOLD:
+                    break
+                entry = self.query_cache.get(int(cache_id))
+                if entry is not None and entry[0] == context_key:
+                    self.query_cache.move_to_end(int(cache_id))
+                    return entry[1]
+            return None
+    
+    def _store_query_cache(self, query_embedding: np.ndarray, context_key: str, result: Dict):
+        """Add a chat result to the semantic cache, evicting the least recently used entry."""
+        if not FAISS_AVAILABLE:
+            return
+        
+        with self._cache_lock:
+            if self.query_cache_index is None:
+                self.query_cache_index = faiss.IndexIDMap(faiss.IndexFlatIP(query_embedding.shape[1]))
+            
+            cache_id = self._next_query_cache_id
+            self._next_query_cache_id += 1
+            self.query_cache_index.add_with_ids(query_embedding, np.array([cache_id], dtype='int64'))
+            self.query_cache[cache_id] = (context_key, result)
+            
+            if len(self.query_cache) > QUERY_CACHE_SIZE:
+                evicted_id, _ = self.query_cache.popitem(last=False)
+                self.query_cache_index.remove_ids(np.array([evicted_id], dtype='int64'))
+    
     def chat(self, query: str, student_data: Dict = None, top_k: int = 3, conversation_context: str = None, full_context: Dict = None) -> Dict:
         """
         Complete RAG chat workflow with comprehensive student context.
@@ -392,8 +742,19 @@ Response:"""
         Returns:
             Dictionary with response and metadata
         """
+        query_embedding = self._embed_query(query)
+        
+        # Responses are personalized, so only reuse them for the same student context
+        context_key = hashlib.sha256(
+            repr((top_k, student_data, conversation_context, full_context)).encode('utf-8')
+        ).hexdigest()
+        if query_embedding is not None:
+            cached = self._lookup_query_cache(query_embedding, context_key)
+            if cached is not None:
+                return {**cached, 'query': query, 'from_cache': True}
+        
         # Search for relevant context
-        search_results = self.search(query, top_k=top_k)
+        search_results = self.search(query, top_k=top_k, query_embedding=query_embedding) if query_embedding is not None else []
         context_docs = [doc for doc, score in search_results]
         
         # Generate response with full context
@@ -405,23 +766,50 @@ Response:"""
             full_context=full_context
         )
         
-        return {
+        result = {
             'query': query,
             'response': response,
             'context_used': context_docs,
             'num_contexts': len(context_docs),
             'has_conversation_context': conversation_context is not None,
-            'has_full_context': full_context is not None
+            'has_full_context': full_context is not None,
+            'from_cache': False
         }
+        
+        if query_embedding is not None and response != ERROR_RESPONSE:
+            self._store_query_cache(query_embedding, context_key, result)
+        
+        return result
     
     def save_index(self, path: str = "data/rag_index.pkl"):
-        """Save RAG index to disk."""
+        """
+        Save RAG index to disk.
+        
+        Documents go in the pickle; embeddings are written next to it as
+        .npy (dense, memory-mapped on load) or .npz (sparse).
+        """
         os.makedirs(os.path.dirname(path), exist_ok=True)
         
+        embeddings_format = None
+        if self.embeddings is not None:
+            embeddings_format = 'npz' if sp.issparse(self.embeddings) else 'npy'
+            emb_path = path.replace('.pkl', f'.{embeddings_format}')
+            # Write to a temp file and rename, so a memory-mapped copy of the old file stays valid
+            tmp_path = f"{emb_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                if embeddings_format == 'npz':
+                    sp.save_npz(f, self.embeddings)
+                else:
+                    np.save(f, self.embeddings)
+            os.replace(tmp_path, emb_path)
+        
         data = {
+            'format': RAG_INDEX_FORMAT,
             'documents': self.documents,
-            'embeddings': self.embeddings,
-            'vectorizer': getattr(self, 'vectorizer', None)
+            'doc_ids': self.doc_ids,
+            'embeddings_format': embeddings_format,
+            # The hashing vectorizer is stateless; only record whether it was used
+            'hashing_vectorizer': self.vectorizer is not None
         }
         
         with open(path, 'wb') as f:
@@ -433,14 +821,34 @@ Response:"""
         logger.info(f"Saved RAG index to {path}")
     
     def load_index(self, path: str = "data/rag_index.pkl"):
-        """Load RAG index from disk."""
+        """
+        Load RAG index from disk.
+        
+        Returns:
+            False if there is no saved index, or it was saved in another
+            format (e.g. an L2 index over unnormalized vectors) and must be rebuilt
+        """
         try:
             with open(path, 'rb') as f:
                 data = pickle.load(f)
             
+            if data.get('format') != RAG_INDEX_FORMAT:
+                logger.warning(f"Index {path} has format {data.get('format')}, expected {RAG_INDEX_FORMAT}; rebuilding")
+                return False
+            
             self.documents = data['documents']
-            self.embeddings = data['embeddings']
-            self.vectorizer = data.get('vectorizer')
+            self.doc_ids = data['doc_ids']
+            self._doc_positions = {doc_id: pos for pos, doc_id in enumerate(self.doc_ids)}
+            self._next_doc_id = max(self.doc_ids, default=-1) + 1
+            
+            embeddings_format = data.get('embeddings_format')
+            if embeddings_format == 'npy':
+                self.embeddings = np.load(path.replace('.pkl', '.npy'), mmap_mode='r')
+            elif embeddings_format == 'npz':
+                self.embeddings = sp.load_npz(path.replace('.pkl', '.npz'))
+            else:
+                self.embeddings = None
+            self.vectorizer = self._make_vectorizer() if data['hashing_vectorizer'] else None
             
             if FAISS_AVAILABLE:
                 faiss_path = path.replace('.pkl', '.faiss')
@@ -454,12 +862,27 @@ Response:"""
             return False
 
 
+_LMS_CONN = None
+
+
+def _get_lms_connection() -> sqlite3.Connection:
+    """Return the long-lived, read-tuned connection to the LMS database."""
+    global _LMS_CONN
+    if _LMS_CONN is None:
+        conn = sqlite3.connect("data/lms.db", check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-65536")
+        _LMS_CONN = conn
+    return _LMS_CONN
+
+
 def load_course_materials_from_db() -> List[str]:
     """Load course materials dynamically from database."""
     docs = []
     try:
-        import sqlite3
-        conn = sqlite3.connect("data/lms.db")
+        conn = _get_lms_connection()
         cursor = conn.cursor()
         
         # Get all VLE materials with descriptions
@@ -470,8 +893,7 @@ def load_course_materials_from_db() -> List[str]:
             ORDER BY count DESC
         """)
         
-        vle_data = cursor.fetchall()
-        for activity_type, count, module in vle_data:
+        for activity_type, count, module in cursor:
             docs.append(
                 f"Module {module} has {count} {activity_type} activities. "
                 f"Access these {activity_type} materials regularly to stay engaged with the course content."
@@ -483,14 +905,13 @@ def load_course_materials_from_db() -> List[str]:
             FROM assessments
         """)
         
-        assessments = cursor.fetchall()
-        for assessment_type, module in assessments:
+        for assessment_type, module in cursor:
             docs.append(
                 f"Module {module} includes {assessment_type} assessments. "
                 f"Prepare thoroughly for {assessment_type} by reviewing course materials and practicing regularly."
             )
         
-        conn.close()
+        cursor.close()
         logger.info(f"Loaded {len(docs)} documents from database")
         
     except Exception as e:
@@ -535,21 +956,54 @@ def initialize_knowledge_base() -> RAGSystem:
         "Connect with classmates through forums and study groups. Peer learning can clarify difficult concepts and provide motivation.",
     ]
     
-    # Load dynamic content from database
-    dynamic_docs = load_course_materials_from_db()
-    course_docs.extend(dynamic_docs)
-        
+    # Embed the static docs while the dynamic content is loaded from the database,
+    # then embed the database docs; results are concatenated in document order
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        db_future = executor.submit(load_course_materials_from_db)
+        static_future = executor.submit(rag.create_semantic_embeddings, course_docs)
+        dynamic_docs = db_future.result()
+        dynamic_embeddings = rag.create_semantic_embeddings(dynamic_docs) if dynamic_docs else None
+        static_embeddings = static_future.result()
+    
     # Note: VLE content is now loaded dynamically via load_course_materials_from_db()
     
-    rag.add_documents(course_docs)
-    rag.build_index()
+    parts = [static_embeddings] if dynamic_embeddings is None else [static_embeddings, dynamic_embeddings]
+    rag.add_documents(course_docs + dynamic_docs)
+    if any(sp.issparse(part) for part in parts):
+        # Gemini failed for part of the corpus; every doc must be in the same embedding space
+        embeddings = rag.create_simple_embeddings(rag.documents)
+    else:
+        embeddings = np.vstack(parts)
+    rag.build_index(embeddings)
     
     # Try to save index
     try:
         rag.save_index()
     except Exception as e:
         logger.warning(f"Could not save index: {e}")
-        return rag
+    return rag
+
+
+_RAG_SINGLETON: Optional[RAGSystem] = None
+_RAG_LOCK = threading.Lock()
+
+
+def get_rag_system() -> RAGSystem:
+    """
+    Return the process-wide RAG system.
+    
+    The first call loads the saved index, or builds the knowledge base if
+    there is none; later calls reuse the same instance.
+    """
+    global _RAG_SINGLETON
+    if _RAG_SINGLETON is None:
+        with _RAG_LOCK:
+            if _RAG_SINGLETON is None:
+                rag = RAGSystem()
+                if not rag.load_index():
+                    rag = initialize_knowledge_base()
+                _RAG_SINGLETON = rag
+    return _RAG_SINGLETON
 
 if __name__ == "__main__":
     # Test RAG system
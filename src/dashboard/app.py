@@ -7,19 +7,27 @@ Main application for Academic Advisors to view student risk and advice.
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import joblib
 import sys
 import os
+import io
+import re
+import ast
+import bisect
+import hashlib
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Optional
 import requests
+from urllib3.util.retry import Retry
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.train import ModelTrainer
-from explainability.shap_explainer import SHAPExplainer
-from prescriptive.llm_advisor import generate_simple_advice
+from database.models import get_db
 
 # Page config
 st.set_page_config(
@@ -53,35 +61,186 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Risk analysis boxes (low, medium, high), rendered once at import
+_RISK_BOX_TEMPLATE = """
+        <div style="background-color: {bg_color}; padding: 15px; border-radius: 8px; border-left: 4px solid {border_color}; margin: 10px 0;">
+        <h4 style="color: {text_color}; margin: 0 0 8px 0;">{risk_color} Risk Level: {risk_text}</h4>
+        <p style="color: {text_color}; margin: 0; font-weight: 500;">{risk_explanation}</p>
+        </div>
+        """
+
+# (risk_color, risk_text, risk_explanation, bg_color, text_color, border_color)
+RISK_STYLES = (
+    ("🟢", "LOW RISK", "Student is performing well and on track for success",
+     "#e8f5e9", "#2e7d32", "#4caf50"),
+    ("🟡", "MEDIUM RISK", "Student shows some concerning patterns that need attention",
+     "#fff3e0", "#ef6c00", "#ff9800"),
+    ("🔴", "HIGH RISK", "Student shows strong indicators of potential course failure",
+     "#ffebee", "#c62828", "#f44336"),
+)
+
+RISK_HTML = tuple(
+    _RISK_BOX_TEMPLATE.format(
+        risk_color=risk_color, risk_text=risk_text, risk_explanation=risk_explanation,
+        bg_color=bg_color, text_color=text_color, border_color=border_color
+    )
+    for risk_color, risk_text, risk_explanation, bg_color, text_color, border_color in RISK_STYLES
+)
+
+
+# (Average from, Good from) per KPI
+STATUS_THRESHOLDS = {
+    'clicks': (200, 500),
+    'days': (14, 30),
+    'score': (50, 70),
+    'assessments': (3, 5),
+}
+STATUS_LABELS = ("🔴 Low", "🟡 Average", "🟢 Good")
+
+
+def metric_status(value, metric: str) -> str:
+    """Low / Average / Good label for a KPI value."""
+    if not value >= STATUS_THRESHOLDS[metric][0]:  # also catches NaN
+        return STATUS_LABELS[0]
+    return STATUS_LABELS[bisect.bisect_right(STATUS_THRESHOLDS[metric], value)]
+
+
+def risk_level(risk_percentage: float) -> int:
+    """Index into RISK_STYLES / RISK_HTML: 0 low, 1 medium (>=40), 2 high (>=70)."""
+    return (risk_percentage >= 40) + (risk_percentage >= 70)
+
+
+PREDICTIONS_CSV = 'data/processed/student_predictions.csv'
+PREDICTIONS_PARQUET = 'data/processed/student_predictions.parquet'
+CATEGORICAL_COLUMNS = ('code_module', 'code_presentation', 'final_result')
+
+
+def optimize_dtypes(data: pd.DataFrame) -> pd.DataFrame:
+    """Downcast prediction columns to compact dtypes."""
+    for col in CATEGORICAL_COLUMNS:
+        if col in data.columns:
+            # Categorical codes make filtering and grouping by course cheaper
+            data[col] = data[col].astype('category')
+    if 'is_at_risk' in data.columns and not data['is_at_risk'].isna().any():
+        data['is_at_risk'] = data['is_at_risk'].astype('int8')
+    if 'risk_probability' in data.columns:
+        data['risk_probability'] = data['risk_probability'].astype('float32')
+    return data
+
+
+def parquet_is_current() -> bool:
+    """True if the Parquet copy exists and is no older than the predictions CSV."""
+    try:
+        parquet_mtime = os.path.getmtime(PREDICTIONS_PARQUET)
+    except OSError:
+        return False
+    try:
+        return parquet_mtime >= os.path.getmtime(PREDICTIONS_CSV)
+    except OSError:
+        return True  # no CSV to be stale against
+
 
 @st.cache_data
 def load_data():
-    """Load processed data and predictions."""
+    """Load processed data and predictions (Parquet if it is up to date, else CSV)."""
     try:
         # Load your processed data
-        data = pd.read_csv('data/processed/student_predictions.csv')
+        data = None
+        if parquet_is_current():
+            try:
+                data = optimize_dtypes(pd.read_parquet(PREDICTIONS_PARQUET))
+            except ImportError:
+                pass
+        if data is None:
+            data = optimize_dtypes(pd.read_csv(PREDICTIONS_CSV))
+            try:
+                # Convert once so later cold starts read the categorical Parquet copy
+                data.to_parquet(PREDICTIONS_PARQUET, index=False)
+            except (ImportError, ValueError, TypeError, OSError):
+                pass
+        # String IDs for the search box, computed once instead of per keystroke
+        try:
+            # Arrow-backed strings run substring search in pyarrow's C++ kernels
+            data['_id_str'] = data['id_student'].astype('string[pyarrow]')
+        except ImportError:
+            data['_id_str'] = data['id_student'].astype(str)
         return data
     except FileNotFoundError:
         st.error("Data file not found. Please run the pipeline first.")
         return None
 
 
+@st.cache_resource
+def load_lookups():
+    """Build lookup tables for the loaded data (shares load_data's lifetime)."""
+    data = load_data()
+    if data is None:
+        return None
+    
+    # Map each student ID to the row of its first enrollment for O(1) detail lookups
+    ids = data['id_student'].tolist()
+    positions = dict(zip(reversed(ids), range(len(ids) - 1, -1, -1)))
+    
+    courses = []
+    course_masks = {}
+    if 'code_module' in data.columns:
+        courses = sorted(data['code_module'].dropna().unique().tolist())
+        # Row masks per course, built in one groupby pass
+        for course, rows in data.groupby('code_module', observed=True, sort=False).indices.items():
+            course_mask = np.zeros(len(data), dtype=bool)
+            course_mask[rows] = True
+            course_masks[course] = course_mask
+    
+    risk_masks = {}
+    if 'is_at_risk' in data.columns:
+        at_risk = data['is_at_risk'].to_numpy()
+        risk_masks = {"At-Risk Only": at_risk == 1, "Safe Only": at_risk == 0}
+    
+    # dict keys keep first-seen order, matching Series.unique()
+    return {
+        'positions': positions,
+        'course_choices': ('All',) + tuple(courses),
+        'student_ids': list(positions),
+        'ids_unique': len(positions) == len(ids),
+        'course_masks': course_masks,
+        'risk_masks': risk_masks,
+    }
+
+
 @st.cache_resource
 def load_model():
     """Load trained model."""
+    # Imported lazily so pages that never touch the model start faster
+    import joblib
+    
     try:
-        model_data = joblib.load('models/best_model.pkl')
+        # Saved uncompressed by ModelTrainer.save_model, so large arrays can be memory-mapped
+        model_data = joblib.load('models/best_model.pkl', mmap_mode='r')
         return model_data
     except FileNotFoundError:
         st.warning("Model file not found. Using demo mode.")
         return None
 
 
-def create_risk_gauge(risk_probability: float):
-    """Create a gauge chart for risk probability."""
+@st.cache_resource(show_spinner=False)
+def prewarm_model():
+    """Start loading the model in the background once per process."""
+    thread = threading.Thread(target=load_model, daemon=True)
+    # load_model is a cached Streamlit function; give the thread this run's context
+    add_script_run_ctx(thread)
+    thread.start()
+    return thread
+
+
+@st.cache_resource(max_entries=128, show_spinner=False)
+def gauge_for_bucket(pct: int):
+    """Build the gauge figure for a whole-percent risk value."""
+    # Plotly is imported on first chart, not at startup
+    import plotly.graph_objects as go
+    
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
-        value=risk_probability * 100,
+        value=pct,
         domain={'x': [0, 1], 'y': [0, 1]},
         title={'text': "Risk Level (%)"},
         gauge={
@@ -104,6 +263,69 @@ def create_risk_gauge(risk_probability: float):
     return fig
 
 
+def create_risk_gauge(risk_probability: float):
+    """Create a gauge chart for risk probability."""
+    # The gauge only shows whole percents, so reuse one figure per bucket
+    return gauge_for_bucket(int(round(float(risk_probability) * 100)))
+
+
+def course_risk_summary(data: pd.DataFrame) -> pd.DataFrame:
+    """At-risk sum, count and percentage per course."""
+    # observed/sort=False: only courses present, in first-seen order, no post-group sort
+    return (
+        data.groupby('code_module', observed=True, sort=False)['is_at_risk']
+        .agg(sum='sum', count='count')
+        .assign(percentage=lambda d: d['sum'] * 100.0 / d['count'])
+        .reset_index()
+    )
+
+
+@st.cache_data(show_spinner=False)
+def overview_stats(data: pd.DataFrame) -> dict:
+    """Aggregate the overview metrics once per dataset."""
+    total_students = len(data)
+    if 'is_at_risk' in data.columns:
+        flags = data['is_at_risk'].to_numpy()
+        # int8/bool flags reduce in one NumPy pass; float columns keep pandas' NaN-skipping sum
+        at_risk = int(flags.sum(dtype=np.int64)) if flags.dtype.kind in 'biu' else int(data['is_at_risk'].sum())
+    else:
+        at_risk = total_students * 0.3
+    
+    course_risk = course_risk_summary(data) if 'code_module' in data.columns else None
+    
+    return {
+        'total_students': total_students,
+        'at_risk': at_risk,
+        'at_risk_pct': (at_risk / total_students) * 100,
+        'safe_students': total_students - at_risk,
+        'high_risk': int(at_risk * 0.4),  # Assume 40% are high risk
+        'course_risk': course_risk,
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def overview_figures(safe_students, at_risk, course_percentages: tuple):
+    """Build the overview charts; keyed on scalar stats so the cache lookup is O(1)."""
+    import plotly.express as px
+    
+    risk_counts = pd.DataFrame({
+        'Category': ['Safe', 'At-Risk'],
+        'Count': [safe_students, at_risk]
+    })
+    pie_fig = px.pie(risk_counts, values='Count', names='Category',
+                     color='Category',
+                     color_discrete_map={'Safe': '#4caf50', 'At-Risk': '#f44336'})
+    
+    bar_fig = None
+    if course_percentages:
+        course_risk = pd.DataFrame(list(course_percentages), columns=['code_module', 'percentage'])
+        bar_fig = px.bar(course_risk, x='code_module', y='percentage',
+                         title='At-Risk % by Course',
+                         labels={'percentage': 'At-Risk %', 'code_module': 'Course'})
+    
+    return pie_fig, bar_fig
+
+
 def overview_page(data):
     """Overview page with statistics."""
     st.title("📊 PLAF Dashboard - Overview")
@@ -115,9 +337,11 @@ def overview_page(data):
     # Summary metrics
     col1, col2, col3, col4 = st.columns(4)
     
-    total_students = len(data)
-    at_risk = data['is_at_risk'].sum() if 'is_at_risk' in data.columns else len(data) * 0.3
-    at_risk_pct = (at_risk / total_students) * 100
+    stats = overview_stats(data)
+    total_students = stats['total_students']
+    at_risk = stats['at_risk']
+    at_risk_pct = stats['at_risk_pct']
+    safe_students = stats['safe_students']
     
     with col1:
         st.metric("Total Students", f"{total_students:,}")
@@ -127,44 +351,82 @@ def overview_page(data):
                  delta=f"{at_risk_pct:.1f}%", delta_color="inverse")
     
     with col3:
-        safe_students = total_students - at_risk
         st.metric("Safe Students", f"{int(safe_students):,}")
     
     with col4:
-        high_risk = int(at_risk * 0.4)  # Assume 40% are high risk
-        st.metric("High Risk", f"{high_risk:,}", delta="Priority")
+        st.metric("High Risk", f"{stats['high_risk']:,}", delta="Priority")
     
     # Risk distribution
     st.subheader("Risk Distribution")
     
+    course_risk = stats['course_risk']
+    course_percentages = ()
+    if course_risk is not None:
+        course_percentages = tuple(zip(course_risk['code_module'].tolist(), course_risk['percentage'].tolist()))
+    pie_fig, bar_fig = overview_figures(safe_students, at_risk, course_percentages)
+    
     col1, col2 = st.columns(2)
     
     with col1:
         # Pie chart
-        risk_counts = pd.DataFrame({
-            'Category': ['Safe', 'At-Risk'],
-            'Count': [safe_students, at_risk]
-        })
-        
-        fig = px.pie(risk_counts, values='Count', names='Category',
-                    color='Category',
-                    color_discrete_map={'Safe': '#4caf50', 'At-Risk': '#f44336'})
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(pie_fig, use_container_width=True)
     
     with col2:
         # Bar chart by course
-        if 'code_module' in data.columns:
-            course_risk = data.groupby('code_module')['is_at_risk'].agg(['sum', 'count'])
-            course_risk['percentage'] = (course_risk['sum'] / course_risk['count']) * 100
-            course_risk = course_risk.reset_index()
-            
-            fig = px.bar(course_risk, x='code_module', y='percentage',
-                        title='At-Risk % by Course',
-                        labels={'percentage': 'At-Risk %', 'code_module': 'Course'})
-            st.plotly_chart(fig, use_container_width=True)
+        if bar_fig is not None:
+            st.plotly_chart(bar_fig, use_container_width=True)
+
+
+@st.cache_data(show_spinner=False)
+def filter_students(data: pd.DataFrame, risk_filter: str, course_filter: str, search: str,
+                    _lookups=None) -> tuple:
+    """Apply the student list filters and project the displayed columns.
+    
+    _lookups (not hashed by Streamlit) supplies the precomputed risk and course masks.
+    Returns the filtered frame and its distinct student IDs.
+    """
+    # Fuse all filters into one NumPy mask and slice the frame once
+    mask = np.ones(len(data), dtype=bool)
+    
+    if risk_filter != "All":
+        if _lookups is not None:
+            mask &= _lookups['risk_masks'][risk_filter]
+        elif risk_filter == "At-Risk Only":
+            mask &= data['is_at_risk'].to_numpy() == 1
+        elif risk_filter == "Safe Only":
+            mask &= data['is_at_risk'].to_numpy() == 0
+    
+    if course_filter != 'All':
+        if _lookups is not None:
+            mask &= _lookups['course_masks'][course_filter]
+        else:
+            mask &= data['code_module'].to_numpy() == course_filter
+    
+    if search:
+        id_str = data['_id_str'] if '_id_str' in data.columns else data['id_student'].astype(str)
+        mask &= id_str.str.contains(search, regex=False, na=False).to_numpy(dtype=bool)
+    
+    # Select columns to display
+    display_cols = ['id_student', 'code_module', 'is_at_risk']
+    if 'risk_probability' in data.columns:
+        display_cols.append('risk_probability')
+    
+    filtered = data.iloc[mask][display_cols]
+    
+    # De-duplicate here so it runs once per filter combination, not once per rerun
+    if _lookups is not None and _lookups['ids_unique']:
+        student_ids = filtered['id_student'].to_numpy()
+    else:
+        student_ids = filtered['id_student'].unique()
+    
+    return filtered, student_ids
 
 
-def student_list_page(data):
+PAGE_SIZE = 50
+MAX_SELECT_OPTIONS = 1000
+
+
+def student_list_page(data, lookups=None):
     """Student list with search and filter."""
     st.title("👥 Student List")
     
@@ -174,6 +436,7 @@ def student_list_page(data):
     
     # Filters
     col1, col2, col3 = st.columns(3)
+    course_filter = 'All'
     
     with col1:
         risk_filter = st.selectbox(
@@ -183,46 +446,43 @@ def student_list_page(data):
     
     with col2:
         if 'code_module' in data.columns:
-            courses = ['All'] + list(data['code_module'].unique())
+            if lookups is not None:
+                courses = lookups['course_choices']
+            elif isinstance(data['code_module'].dtype, pd.CategoricalDtype):
+                courses = ['All'] + data['code_module'].cat.categories.tolist()
+            else:
+                courses = ['All'] + list(data['code_module'].unique())
             course_filter = st.selectbox("Course", courses)
     
     with col3:
         search = st.text_input("Search Student ID")
     
-    # Apply filters
-    filtered_data = data.copy()
+    # Apply filters (cached per filter combination)
+    filtered_data, filtered_ids = filter_students(data, risk_filter, course_filter, search, lookups)
     
-    if risk_filter == "At-Risk Only":
-        filtered_data = filtered_data[filtered_data['is_at_risk'] == 1]
-    elif risk_filter == "Safe Only":
-        filtered_data = filtered_data[filtered_data['is_at_risk'] == 0]
-    
-    if course_filter != 'All':
-        filtered_data = filtered_data[filtered_data['code_module'] == course_filter]
+    # Display table, one page at a time so only PAGE_SIZE rows reach the browser
+    n_pages = max(1, -(-len(filtered_data) // PAGE_SIZE))
+    page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+    start = (int(page) - 1) * PAGE_SIZE
+    st.write(f"Showing {len(filtered_data)} students (page {int(page)} of {n_pages})")
     
-    if search:
-        filtered_data = filtered_data[filtered_data['id_student'].astype(str).str.contains(search)]
-    
-    # Display table
-    st.write(f"Showing {len(filtered_data)} students")
-    
-    # Select columns to display
-    display_cols = ['id_student', 'code_module', 'is_at_risk']
-    if 'risk_probability' in filtered_data.columns:
-        display_cols.append('risk_probability')
-    
-    display_df = filtered_data[display_cols].copy()
-    
-    if 'risk_probability' in display_df.columns:
-        display_df['risk_probability'] = display_df['risk_probability'].round(3)
-    
-    st.dataframe(display_df, use_container_width=True)
+    # filter_students already projected the columns; round in the browser
+    st.dataframe(
+        filtered_data.iloc[start:start + PAGE_SIZE],
+        use_container_width=True,
+        column_config={"risk_probability": st.column_config.NumberColumn(format="%.3f")}
+    )
     
     # Select student for details
     if len(filtered_data) > 0:
+        if lookups is not None and risk_filter == "All" and course_filter == 'All' and not search:
+            # No filter applied, so the precomputed ID list is already the answer
+            student_ids = lookups['student_ids']
+        else:
+            student_ids = filtered_ids
         student_id = st.selectbox(
             "Select student for detailed view:",
-            filtered_data['id_student'].unique()
+            student_ids[:MAX_SELECT_OPTIONS]
         )
         
         if st.button("View Details"):
@@ -230,7 +490,7 @@ def student_list_page(data):
             st.rerun()
 
 
-def student_detail_page(data, model_data):
+def student_detail_page(data, model_data, lookups=None):
     """Individual student detail page."""
     st.title("🎓 Student Detail View")
     
@@ -295,7 +555,22 @@ def student_detail_page(data, model_data):
         return
     
     # Real data mode
-    student_data = data[data['id_student'] == student_id].iloc[0]
+    if lookups is not None:
+        position = lookups['positions'].get(student_id)
+        if position is None:
+            st.warning(f"Student {student_id} not found in the current data")
+            return
+        student_data = data.iloc[position]
+    else:
+        student_data = data[data['id_student'] == student_id].iloc[0]
+    
+    # Plain dict lookups are much cheaper than the many Series lookups below
+    student_data = student_data.to_dict()
+    has_days = 'num_days_active' in student_data
+    has_clicks = 'total_clicks' in student_data
+    has_assessments = 'num_assessments' in student_data
+    has_score = 'avg_score' in student_data
+    has_result = 'final_result' in student_data
     
     # Student basic info
     col1, col2, col3 = st.columns(3)
@@ -312,10 +587,10 @@ def student_detail_page(data, model_data):
     
     with info_col1:
         # Use available data fields
-        if 'num_days_active' in student_data:
+        if has_days:
             days_active = int(student_data['num_days_active'])
             st.metric("Days Active", f"{days_active} days")
-        elif 'total_clicks' in student_data:
+        elif has_clicks:
             # Estimate based on clicks (rough calculation)
             total_clicks = int(student_data['total_clicks'])
             estimated_days = max(1, total_clicks // 20)  # Assume 20 clicks per day average
@@ -324,9 +599,9 @@ def student_detail_page(data, model_data):
             st.metric("Days Active", "📊 Calculating...")
     
     with info_col2:
-        if 'total_clicks' in student_data:
+        if has_clicks:
             total_clicks = int(student_data['total_clicks'])
-            if 'num_days_active' in student_data:
+            if has_days:
                 days_active = int(student_data['num_days_active'])
                 avg_daily = total_clicks / max(days_active, 1)
             else:
@@ -336,10 +611,10 @@ def student_detail_page(data, model_data):
             st.metric("Daily Engagement", "📊 Calculating...")
     
     with info_col3:
-        if 'num_assessments' in student_data:
+        if has_assessments:
             assessments = int(student_data['num_assessments'])
             st.metric("Assessments", f"{assessments} completed")
-        elif 'final_result' in student_data and student_data['final_result'] != 'N/A':
+        elif has_result and student_data['final_result'] != 'N/A':
             # Use final result as assessment indicator
             result = student_data['final_result']
             st.metric("Course Status", f"{result}")
@@ -347,11 +622,11 @@ def student_detail_page(data, model_data):
             st.metric("Assessments", "📊 In Progress")
     
     with info_col4:
-        if 'avg_score' in student_data:
+        if has_score:
             avg_score = student_data['avg_score']
-            score_status = "🟢 Good" if avg_score >= 70 else "🟡 Average" if avg_score >= 50 else "🔴 Low"
+            score_status = metric_status(avg_score, 'score')
             st.metric("Average Score", f"{avg_score:.1f}% {score_status}")
-        elif 'final_result' in student_data:
+        elif has_result:
             result = student_data['final_result']
             if result in ['Pass', 'Distinction']:
                 st.metric("Course Result", f"✅ {result}")
@@ -375,86 +650,74 @@ def student_detail_page(data, model_data):
         
         # Risk explanation
         risk_percentage = risk_prob * 100 if risk_prob <= 1 else risk_prob
-        
-        if risk_percentage >= 70:
-            risk_color = "🔴"
-            risk_text = "HIGH RISK"
-            risk_explanation = "Student shows strong indicators of potential course failure"
-        elif risk_percentage >= 40:
-            risk_color = "🟡"
-            risk_text = "MEDIUM RISK"
-            risk_explanation = "Student shows some concerning patterns that need attention"
-        else:
-            risk_color = "🟢"
-            risk_text = "LOW RISK"
-            risk_explanation = "Student is performing well and on track for success"
-        
-        # Better contrast colors
-        if risk_percentage >= 70:
-            bg_color = "#ffebee"
-            text_color = "#c62828"
-            border_color = "#f44336"
-        elif risk_percentage >= 40:
-            bg_color = "#fff3e0"
-            text_color = "#ef6c00"
-            border_color = "#ff9800"
-        else:
-            bg_color = "#e8f5e9"
-            text_color = "#2e7d32"
-            border_color = "#4caf50"
-        
-        st.markdown(f"""
-        <div style="background-color: {bg_color}; padding: 15px; border-radius: 8px; border-left: 4px solid {border_color}; margin: 10px 0;">
-        <h4 style="color: {text_color}; margin: 0 0 8px 0;">{risk_color} Risk Level: {risk_text}</h4>
-        <p style="color: {text_color}; margin: 0; font-weight: 500;">{risk_explanation}</p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(RISK_HTML[risk_level(risk_percentage)], unsafe_allow_html=True)
         
         # Key performance indicators
         st.subheader("📊 Key Performance Indicators")
         metrics_col1, metrics_col2 = st.columns(2)
         
         with metrics_col1:
-            if 'total_clicks' in student_data:
+            if has_clicks:
                 clicks = int(student_data['total_clicks'])
-                click_status = "🟢 Good" if clicks >= 500 else "🟡 Average" if clicks >= 200 else "🔴 Low"
+                click_status = metric_status(clicks, 'clicks')
                 st.metric("VLE Engagement", f"{clicks} clicks {click_status}")
             
-            if 'num_days_active' in student_data:
+            if has_days:
                 days = int(student_data['num_days_active'])
-                day_status = "🟢 Good" if days >= 30 else "🟡 Average" if days >= 14 else "🔴 Low"
+                day_status = metric_status(days, 'days')
                 st.metric("Activity Level", f"{days} days {day_status}")
         
         with metrics_col2:
-            if 'avg_score' in student_data:
+            if has_score:
                 score = student_data['avg_score']
-                score_status = "🟢 Good" if score >= 70 else "🟡 Average" if score >= 50 else "🔴 Low"
+                score_status = metric_status(score, 'score')
                 st.metric("Academic Performance", f"{score:.1f}% {score_status}")
             
-            if 'num_assessments' in student_data:
+            if has_assessments:
                 assessments = int(student_data['num_assessments'])
-                assess_status = "🟢 Good" if assessments >= 5 else "🟡 Average" if assessments >= 3 else "🔴 Low"
+                assess_status = metric_status(assessments, 'assessments')
                 st.metric("Assessment Completion", f"{assessments} {assess_status}")
 
 
-def quiz_management_page():
-    """Quiz Management page for CRUD operations."""
-    st.title("🎯 Quiz Management")
-    
-    # Import database
-    from database.models import get_db
-    db = get_db()
-    
-    # Tabs for different operations
-    tab1, tab2, tab3 = st.tabs(["📋 View Quizzes", "➕ Create Quiz", "✏️ Edit Quiz"])
+@st.cache_resource
+def get_db_connection() -> sqlite3.Connection:
+    """Return the long-lived LMS connection shared by every rerun and session."""
+    conn = sqlite3.connect(get_db().db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # Return dict-like rows
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn
+
+
+@st.cache_resource
+def get_db_lock() -> threading.Lock:
+    """Serialize use of the shared connection; sessions run on separate threads.
     
-    with tab1:
-        st.subheader("📋 All Quizzes")
-        
-        # Get all quizzes with course and lesson info
-        conn = db.connect()
-        cursor = conn.cursor()
-        
+    Reads take it too: on one connection they would otherwise see another
+    session's transaction half-applied.
+    """
+    return threading.Lock()
+
+
+# (display label, list_quizzes key) for the "View Quizzes" table
+QUIZ_TABLE_COLUMNS = (
+    ('ID', 'id'),
+    ('Course', 'course_title'),
+    ('Lesson', 'lesson_title'),
+    ('Quiz Title', 'title'),
+    ('Duration (min)', 'duration_minutes'),
+    ('Passing Score (%)', 'passing_score'),
+    ('Max Attempts', 'max_attempts'),
+    ('Questions', 'question_count'),
+)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def list_quizzes() -> list:
+    """All quizzes with course, lesson and question count (cleared after quiz writes)."""
+    with get_db_lock():
+        cursor = get_db_connection().cursor()
         cursor.execute("""
             SELECT q.id, q.title, q.duration_minutes, q.passing_score, q.max_attempts,
                    c.title as course_title, l.title as lesson_title,
@@ -466,25 +729,81 @@ def quiz_management_page():
             GROUP BY q.id
             ORDER BY c.id, l.id
         """)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def list_quiz_choices() -> list:
+    """Quizzes for the edit dropdown, ordered by course and lesson title."""
+    with get_db_lock():
+        cursor = get_db_connection().cursor()
+        cursor.execute("""
+            SELECT q.id, q.title, c.title as course_title, l.title as lesson_title
+            FROM quizzes q
+            JOIN courses c ON q.course_id = c.id
+            JOIN lessons l ON q.lesson_id = l.id
+            ORDER BY c.title, l.title
+        """)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_quiz_catalog() -> tuple:
+    """Courses and their lessons for the quiz form dropdowns, loaded in one go.
+    
+    Returns (courses, lessons_by_course) with lessons in lesson order.
+    """
+    lessons_by_course = {}
+    with get_db_lock():
+        cursor = get_db_connection().cursor()
+        cursor.execute("SELECT id, title FROM courses ORDER BY title")
+        courses = [dict(row) for row in cursor.fetchall()]
+        
+        cursor.execute("SELECT id, title, course_id FROM lessons ORDER BY course_id, lesson_order")
+        for row in cursor:
+            lessons_by_course.setdefault(row['course_id'], []).append(dict(row))
+    
+    return courses, lessons_by_course
+
+
+def parse_options(raw):
+    """Decode stored question options: JSON, or a legacy Python list literal."""
+    if not isinstance(raw, str):
+        return raw
+    try:
+        return json.loads(raw)
+    except ValueError:
+        # Older rows were saved with str(list); literal_eval parses them without eval()
+        return ast.literal_eval(raw)
+
+
+def clear_quiz_caches():
+    """Drop the cached quiz queries after a write; the caches are shared by every session."""
+    list_quizzes.clear()
+    list_quiz_choices.clear()
+    load_quiz_catalog.clear()
+
+
+def quiz_management_page():
+    """Quiz Management page for CRUD operations."""
+    st.title("🎯 Quiz Management")
+    
+    db = get_db()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # Tabs for different operations
+    tab1, tab2, tab3 = st.tabs(["📋 View Quizzes", "➕ Create Quiz", "✏️ Edit Quiz"])
+    
+    with tab1:
+        st.subheader("📋 All Quizzes")
         
-        quizzes = cursor.fetchall()
+        # Get all quizzes with course and lesson info
+        quizzes = list_quizzes()
         
         if quizzes:
-            # Display as dataframe
-            quiz_data = []
-            for quiz in quizzes:
-                quiz_data.append({
-                    'ID': quiz['id'],
-                    'Course': quiz['course_title'],
-                    'Lesson': quiz['lesson_title'],
-                    'Quiz Title': quiz['title'],
-                    'Duration (min)': quiz['duration_minutes'],
-                    'Passing Score (%)': quiz['passing_score'],
-                    'Max Attempts': quiz['max_attempts'],
-                    'Questions': quiz['question_count']
-                })
-            
-            df = pd.DataFrame(quiz_data)
+            # Display as dataframe, built column by column
+            df = pd.DataFrame({label: [q[key] for q in quizzes] for label, key in QUIZ_TABLE_COLUMNS})
             st.dataframe(df, use_container_width=True)
             
             # Quiz statistics
@@ -507,8 +826,7 @@ def quiz_management_page():
         st.subheader("➕ Create New Quiz")
         
         # Get courses and lessons for dropdown
-        cursor.execute("SELECT id, title FROM courses ORDER BY title")
-        courses = cursor.fetchall()
+        courses, lessons_by_course = load_quiz_catalog()
         
         if courses:
             with st.form("create_quiz_form"):
@@ -518,8 +836,7 @@ def quiz_management_page():
                 course_id = course_options[selected_course]
                 
                 # Lesson selection
-                cursor.execute("SELECT id, title FROM lessons WHERE course_id = ? ORDER BY lesson_order", (course_id,))
-                lessons = cursor.fetchall()
+                lessons = lessons_by_course.get(course_id, [])
                 
                 if lessons:
                     lesson_options = {f"{l['title']} (ID: {l['id']})": l['id'] for l in lessons}
@@ -551,6 +868,7 @@ def quiz_management_page():
                                     max_attempts=max_attempts
                                 )
                                 st.success(f"✅ Quiz created successfully! Quiz ID: {quiz_id}")
+                                clear_quiz_caches()
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"❌ Failed to create quiz: {e}")
@@ -565,14 +883,7 @@ def quiz_management_page():
         st.subheader("✏️ Edit Quiz")
         
         # Get all quizzes for selection
-        cursor.execute("""
-            SELECT q.id, q.title, c.title as course_title, l.title as lesson_title
-            FROM quizzes q
-            JOIN courses c ON q.course_id = c.id
-            JOIN lessons l ON q.lesson_id = l.id
-            ORDER BY c.title, l.title
-        """)
-        edit_quizzes = cursor.fetchall()
+        edit_quizzes = list_quiz_choices()
         
         if edit_quizzes:
             quiz_options = {f"{q['course_title']} → {q['lesson_title']} → {q['title']} (ID: {q['id']})": q['id'] for q in edit_quizzes}
@@ -580,8 +891,9 @@ def quiz_management_page():
             quiz_id = quiz_options[selected_quiz]
             
             # Get quiz details
-            cursor.execute("SELECT * FROM quizzes WHERE id = ?", (quiz_id,))
-            quiz = cursor.fetchone()
+            with get_db_lock():
+                cursor.execute("SELECT * FROM quizzes WHERE id = ?", (quiz_id,))
+                quiz = cursor.fetchone()
             
             if quiz:
                 with st.form("edit_quiz_form"):
@@ -602,14 +914,15 @@ def quiz_management_page():
                     with col1:
                         if st.form_submit_button("💾 Update Quiz"):
                             try:
-                                cursor.execute("""
-                                    UPDATE quizzes 
-                                    SET title = ?, description = ?, duration_minutes = ?, 
-                                        passing_score = ?, max_attempts = ?
-                                    WHERE id = ?
-                                """, (new_title, new_description, new_duration, new_passing_score, new_max_attempts, quiz_id))
-                                conn.commit()
+                                with get_db_lock(), conn:
+                                    cursor.execute("""
+                                        UPDATE quizzes 
+                                        SET title = ?, description = ?, duration_minutes = ?, 
+                                            passing_score = ?, max_attempts = ?
+                                        WHERE id = ?
+                                    """, (new_title, new_description, new_duration, new_passing_score, new_max_attempts, quiz_id))
                                 st.success("✅ Quiz updated successfully!")
+                                clear_quiz_caches()
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"❌ Failed to update quiz: {e}")
@@ -617,29 +930,31 @@ def quiz_management_page():
                     with col2:
                         if st.form_submit_button("🗑️ Delete Quiz", type="secondary"):
                             try:
-                                # Delete quiz questions first
-                                cursor.execute("DELETE FROM quiz_questions WHERE quiz_id = ?", (quiz_id,))
-                                # Delete quiz results
-                                cursor.execute("DELETE FROM quiz_results WHERE quiz_id = ?", (quiz_id,))
-                                # Delete quiz
-                                cursor.execute("DELETE FROM quizzes WHERE id = ?", (quiz_id,))
-                                conn.commit()
+                                with get_db_lock(), conn:
+                                    # Delete quiz questions first
+                                    cursor.execute("DELETE FROM quiz_questions WHERE quiz_id = ?", (quiz_id,))
+                                    # Delete quiz results
+                                    cursor.execute("DELETE FROM quiz_results WHERE quiz_id = ?", (quiz_id,))
+                                    # Delete quiz
+                                    cursor.execute("DELETE FROM quizzes WHERE id = ?", (quiz_id,))
                                 st.success("✅ Quiz deleted successfully!")
+                                clear_quiz_caches()
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"❌ Failed to delete quiz: {e}")
                 
                 # Show quiz questions
                 st.subheader("📝 Quiz Questions")
-                cursor.execute("SELECT * FROM quiz_questions WHERE quiz_id = ? ORDER BY question_order", (quiz_id,))
-                questions = cursor.fetchall()
+                with get_db_lock():
+                    cursor.execute("SELECT * FROM quiz_questions WHERE quiz_id = ? ORDER BY question_order", (quiz_id,))
+                    questions = cursor.fetchall()
                 
                 if questions:
                     for i, q in enumerate(questions):
                         with st.expander(f"Question {i+1}: {q['question_text'][:50]}..."):
                             st.write(f"**Question:** {q['question_text']}")
                             if q['options']:
-                                options = eval(q['options']) if isinstance(q['options'], str) else q['options']
+                                options = parse_options(q['options'])
                                 for j, option in enumerate(options):
                                     marker = "✅" if j == q['correct_answer'] else "❌"
                                     st.write(f"{marker} {j+1}. {option}")
@@ -657,6 +972,9 @@ def quiz_management_page():
 def main():
     """Main application."""
     
+    # Warm the model cache before anyone opens Student Details
+    prewarm_model()
+    
     # Sidebar navigation
     st.sidebar.title("🎓 PLAF Navigation")
     
@@ -667,17 +985,17 @@ def main():
     
     # Load data
     data = load_data()
-    model_data = load_model()
+    lookups = load_lookups()
     
     # Route to pages
     if page == "Overview":
         overview_page(data)
     
     elif page == "Student List":
-        student_list_page(data)
+        student_list_page(data, lookups)
     
     elif page == "Student Details":
-        student_detail_page(data, model_data)
+        student_detail_page(data, load_model(), lookups)
     
     elif page == "Course Management":
         course_management_page()
@@ -716,6 +1034,14 @@ def main():
         """)
 
 
+def admin_ui_state() -> dict:
+    """Admin edit flags for this session, as ID sets under one session_state key."""
+    return st.session_state.setdefault('admin_ui', {
+        'editing_course': set(),
+        'editing_lesson': set(),
+    })
+
+
 def course_management_page():
     """Course Management CRUD interface."""
     st.title("⚙️ Course Management")
@@ -734,64 +1060,195 @@ def course_management_page():
         manage_lessons_tab()
 
 
+API_BASE_URL = "http://localhost:8000"
+API_TIMEOUT = (3, 10)  # (connect, read) seconds; keeps a stalled API from pinning a worker thread
+UPLOAD_TIMEOUT = (3, 30)  # image uploads are proxied on to ImgBB
+
+
+@dataclass
+class CourseForm:
+    """Fields submitted by the add/edit course forms (the admin API payload)."""
+    title: str
+    description: str
+    instructor_name: str
+    instructor_title: str
+    duration_hours: int
+    level: str
+    category: str
+    thumbnail_url: str
+    code_module: Optional[str] = None
+    course_code: Optional[str] = None
+
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Return a pooled HTTP session for the admin API, shared across reruns."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        # Retry transient gateway errors on idempotent methods; hand back the last response otherwise
+        max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504), raise_on_status=False)
+    )
+    session.mount('http://', adapter)
+    return session
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_courses() -> list:
+    """Fetch the admin course list (with lesson counts) from the API; cleared after admin writes."""
+    response = get_http_session().get(f"{API_BASE_URL}/api/admin/courses", timeout=API_TIMEOUT)
+    response.raise_for_status()
+    return response.json().get('courses', [])
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_code_modules() -> list:
+    """Distinct OULAD module codes for the course forms (errors are not cached)."""
+    with get_db_lock():
+        cursor = get_db_connection().cursor()
+        cursor.execute("SELECT DISTINCT code_module FROM students WHERE code_module != '' ORDER BY code_module")
+        return [row["code_module"] for row in cursor.fetchall()]
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_course_detail(course_id: int) -> dict:
+    """Fetch one course with its lessons; cleared after lesson writes."""
+    response = get_http_session().get(f"{API_BASE_URL}/api/courses/{course_id}", timeout=API_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+THUMBNAIL_MAX_SIDE = 1280
+THUMBNAIL_WEBP_QUALITY = 82
+
+
+def thumbnail_upload(uploaded_file) -> tuple:
+    """Multipart (name, file, type) for a thumbnail, downscaled and re-encoded as WebP.
+    
+    Falls back to the original bytes if Pillow is missing or cannot decode the image.
+    """
+    uploaded_file.seek(0)
+    try:
+        from PIL import Image
+        
+        image = Image.open(uploaded_file)
+        image.thumbnail((THUMBNAIL_MAX_SIDE, THUMBNAIL_MAX_SIDE))
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=THUMBNAIL_WEBP_QUALITY, method=4)
+        buffer.seek(0)
+        return f"{os.path.splitext(uploaded_file.name)[0]}.webp", buffer, "image/webp"
+    except Exception:
+        uploaded_file.seek(0)
+        return uploaded_file.name, uploaded_file, uploaded_file.type or "application/octet-stream"
+
+
+@st.cache_resource
+def get_upload_cache() -> dict:
+    """Process-wide map of image content hash -> upload response."""
+    return {}
+
+
+def upload_thumbnail(uploaded_file):
+    """Upload a course thumbnail via the API; return the response JSON or None on failure."""
+    with uploaded_file.getbuffer() as view:
+        digest = hashlib.blake2b(view, digest_size=16).hexdigest()
+    
+    cache = get_upload_cache()
+    if digest not in cache:
+        files = {"file": thumbnail_upload(uploaded_file)}
+        response = get_http_session().post(f"{API_BASE_URL}/api/upload-image", files=files,
+                                           timeout=UPLOAD_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        cache[digest] = response.json()
+    return cache[digest]
+
+
+COURSES_PER_PAGE = 10
+PREFETCH_COURSES = 20
+
+
+@st.cache_resource
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    """Small shared pool for background API prefetches."""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="course-prefetch")
+
+
+@st.cache_resource(ttl=30, show_spinner=False)
+def prefetch_course_details(course_ids: tuple):
+    """Fetch course details in the background; runs once per ID tuple per detail TTL."""
+    executor = get_prefetch_executor()
+    return [executor.submit(fetch_course_detail, course_id) for course_id in course_ids]
+
+
 def view_courses_tab():
     """View and edit existing courses."""
     st.subheader("📚 All Courses")
     
     try:
-        # Get courses from API
-        response = requests.get("http://localhost:8000/api/courses", timeout=10)
+        # Get courses from API (pooled session, cached for a short TTL)
+        try:
+            courses = fetch_courses()
+        except requests.HTTPError:
+            st.error("Failed to load courses from API")
+            return
         
-        if response.status_code == 200:
-            courses_data = response.json()
-            courses = courses_data.get('courses', [])
+        if courses:
+            # Only build expanders and action buttons for one page of courses
+            n_pages = max(1, -(-len(courses) // COURSES_PER_PAGE))
+            page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key="courses_page")
+            start = (int(page) - 1) * COURSES_PER_PAGE
+            st.caption(f"{len(courses)} courses (page {int(page)} of {n_pages})")
             
-            if courses:
-                # Display courses in a nice format
-                for course in courses:
-                    with st.expander(f"📖 {course['title']} ({course['level']})"):
-                        col1, col2 = st.columns([2, 1])
+            # Display courses in a nice format
+            for course in courses[start:start + COURSES_PER_PAGE]:
+                with st.expander(f"📖 {course['title']} ({course['level']})"):
+                    col1, col2 = st.columns([2, 1])
+                    
+                    with col1:
+                        st.write(f"**Description:** {course['description']}")
+                        st.write(f"**Instructor:** {course['instructor_name']}")
+                        st.write(f"**Duration:** {course.get('duration_hours', 0)} hours")
+                        st.write(f"**Lessons:** {course.get('lessons_count', 0)}")
+                        st.write(f"**Category:** {course.get('category', 'N/A')}")
+                        st.write(f"**Dataset Module Code:** {course.get('code_module') or 'Not linked'}")
+                        st.write(f"**Course Code (unique):** {course.get('course_code') or 'N/A'}")
                         
-                        with col1:
-                            st.write(f"**Description:** {course['description']}")
-                            st.write(f"**Instructor:** {course['instructor_name']}")
-                            st.write(f"**Duration:** {course.get('duration_hours', 0)} hours")
-                            st.write(f"**Category:** {course.get('category', 'N/A')}")
-                            st.write(f"**Dataset Module Code:** {course.get('code_module') or 'Not linked'}")
-                            st.write(f"**Course Code (unique):** {course.get('course_code') or 'N/A'}")
-                            
-                            if course.get('thumbnail_url'):
-                                st.image(course['thumbnail_url'], width=200)
+                        if course.get('thumbnail_url'):
+                            st.image(course['thumbnail_url'], width=200)
+                    
+                    with col2:
+                        st.write("**Actions:**")
                         
-                        with col2:
-                            st.write("**Actions:**")
-                            
-                            # Edit button
-                            if st.button(f"✏️ Edit", key=f"edit_{course['id']}"):
-                                st.session_state[f"editing_course_{course['id']}"] = True
-                            
-                            # Delete button
-                            if st.button(f"🗑️ Delete", key=f"delete_{course['id']}"):
-                                if st.session_state.get(f"confirm_delete_{course['id']}", False):
-                                    # Actually delete
-                                    delete_response = requests.delete(f"http://localhost:8000/api/admin/courses/{course['id']}")
+                        # Edit button
+                        if st.button(f"✏️ Edit", key=f"edit_{course['id']}"):
+                            admin_ui_state()['editing_course'].add(course['id'])
+                        
+                        # Delete: ticking the confirm box inside the form does not rerun the tab
+                        with st.form(f"delete_course_{course['id']}"):
+                            confirmed = st.checkbox("Confirm delete")
+                            if st.form_submit_button("🗑️ Delete"):
+                                if not confirmed:
+                                    st.warning("Tick 'Confirm delete' first")
+                                else:
+                                    delete_response = get_http_session().delete(f"{API_BASE_URL}/api/admin/courses/{course['id']}",
+                                                                                timeout=API_TIMEOUT)
                                     if delete_response.status_code == 200:
                                         st.success(f"Deleted course: {course['title']}")
+                                        fetch_courses.clear()
+                                        clear_quiz_caches()  # quiz views list course and lesson titles
                                         st.rerun()
                                     else:
                                         st.error("Failed to delete course")
-                                else:
-                                    st.session_state[f"confirm_delete_{course['id']}"] = True
-                                    st.warning("Click delete again to confirm")
-                        
-                        # Edit form (if editing)
-                        if st.session_state.get(f"editing_course_{course['id']}", False):
-                            st.markdown("---")
-                            edit_course_form(course)
-            else:
-                st.info("No courses found.")
+                    
+                    # Edit form (if editing)
+                    if course['id'] in admin_ui_state()['editing_course']:
+                        st.markdown("---")
+                        edit_course_form(course)
         else:
-            st.error("Failed to load courses from API")
+            st.info("No courses found.")
             
     except Exception as e:
         st.error(f"Error: {e}")
@@ -816,12 +1273,7 @@ def edit_course_form(course):
 
         # Dataset module mapping (code_module from OULAD)
         try:
-            from database.models import get_db
-            db = get_db()
-            conn = db.connect()
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT code_module FROM students WHERE code_module != '' ORDER BY code_module")
-            modules = [row["code_module"] for row in cursor.fetchall()]
+            modules = load_code_modules()
         except Exception:
             modules = []
 
@@ -845,36 +1297,36 @@ def edit_course_form(course):
                     final_thumbnail_url = thumbnail_url
                     
                     if uploaded_file is not None:
-                        # Upload to ImgBB
-                        files = {"file": uploaded_file.getvalue()}
-                        upload_response = requests.post("http://localhost:8000/api/upload-image", files=files)
+                        # Upload to ImgBB (reused if these exact bytes were uploaded before)
+                        upload_data = upload_thumbnail(uploaded_file)
                         
-                        if upload_response.status_code == 200:
-                            upload_data = upload_response.json()
+                        if upload_data is not None:
                             final_thumbnail_url = upload_data['url']
                             st.success(f"✅ Image uploaded: {upload_data['filename']}")
                         else:
                             st.warning("⚠️ Image upload failed, using existing URL")
                     
-                    update_data = {
-                        "title": title,
-                        "description": description,
-                        "instructor_name": instructor_name,
-                        "instructor_title": instructor_title,
-                        "duration_hours": duration_hours,
-                        "level": level,
-                        "category": category,
-                        "thumbnail_url": final_thumbnail_url,
-                        "code_module": None if code_module == "(None)" else code_module,
-                        "course_code": course_code or None,
-                    }
+                    update_data = CourseForm(
+                        title=title,
+                        description=description,
+                        instructor_name=instructor_name,
+                        instructor_title=instructor_title,
+                        duration_hours=duration_hours,
+                        level=level,
+                        category=category,
+                        thumbnail_url=final_thumbnail_url,
+                        code_module=None if code_module == "(None)" else code_module,
+                        course_code=course_code or None,
+                    )
                     
-                    response = requests.put(f"http://localhost:8000/api/admin/courses/{course['id']}", 
-                                          json=update_data)
+                    response = get_http_session().put(f"{API_BASE_URL}/api/admin/courses/{course['id']}", 
+                                                      json=asdict(update_data), timeout=API_TIMEOUT)
                     
                     if response.status_code == 200:
                         st.success("Course updated successfully!")
-                        st.session_state[f"editing_course_{course['id']}"] = False
+                        fetch_courses.clear()
+                        clear_quiz_caches()
+                        admin_ui_state()['editing_course'].discard(course['id'])
                         st.rerun()
                     else:
                         st.error("Failed to update course")
@@ -884,7 +1336,7 @@ def edit_course_form(course):
         
         with col2:
             if st.form_submit_button("❌ Cancel"):
-                st.session_state[f"editing_course_{course['id']}"] = False
+                admin_ui_state()['editing_course'].discard(course['id'])
                 st.rerun()
 
 
@@ -906,12 +1358,7 @@ def add_course_tab():
 
         # Dataset module mapping (from OULAD)
         try:
-            from database.models import get_db
-            db = get_db()
-            conn = db.connect()
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT code_module FROM students WHERE code_module != '' ORDER BY code_module")
-            modules = [row["code_module"] for row in cursor.fetchall()]
+            modules = load_code_modules()
         except Exception:
             modules = []
 
@@ -928,40 +1375,39 @@ def add_course_tab():
                 st.error("Please fill in all required fields (*)")
             else:
                 try:
-                    import requests
-                    
                     # Upload image if provided
                     final_thumbnail_url = thumbnail_url
                     
                     if uploaded_file is not None:
-                        # Upload to ImgBB
-                        files = {"file": uploaded_file.getvalue()}
-                        upload_response = requests.post("http://localhost:8000/api/upload-image", files=files)
+                        # Upload to ImgBB (reused if these exact bytes were uploaded before)
+                        upload_data = upload_thumbnail(uploaded_file)
                         
-                        if upload_response.status_code == 200:
-                            upload_data = upload_response.json()
+                        if upload_data is not None:
                             final_thumbnail_url = upload_data['url']
                             st.success(f"Image uploaded: {upload_data['filename']}")
                         else:
                             st.warning("Image upload failed, proceeding without image")
                     
                     # Create course
-                    course_data = {
-                        "title": title,
-                        "description": description,
-                        "instructor_name": instructor_name,
-                        "instructor_title": instructor_title,
-                        "duration_hours": duration_hours,
-                        "level": level,
-                        "category": category,
-                        "thumbnail_url": final_thumbnail_url,
-                        "code_module": None if code_module == "(None)" else code_module,
-                        "course_code": course_code_input or None,
-                    }
+                    course_data = CourseForm(
+                        title=title,
+                        description=description,
+                        instructor_name=instructor_name,
+                        instructor_title=instructor_title,
+                        duration_hours=duration_hours,
+                        level=level,
+                        category=category,
+                        thumbnail_url=final_thumbnail_url,
+                        code_module=None if code_module == "(None)" else code_module,
+                        course_code=course_code_input or None,
+                    )
                     
-                    response = requests.post("http://localhost:8000/api/admin/courses", json=course_data)
+                    response = get_http_session().post(f"{API_BASE_URL}/api/admin/courses", json=asdict(course_data),
+                                                       timeout=API_TIMEOUT)
                     
                     if response.status_code == 200:
+                        fetch_courses.clear()
+                        clear_quiz_caches()
                         result = response.json()
                         st.success(f"✅ Course created successfully! ID: {result['course_id']}")
                         st.balloons()
@@ -977,73 +1423,74 @@ def manage_lessons_tab():
     st.subheader("🔧 Lesson Management")
     
     try:
-        import requests
-        
-        # Get courses for selection
-        response = requests.get("http://localhost:8000/api/courses")
+        # Get courses for selection (shared cache with the View Courses tab)
+        try:
+            courses = fetch_courses()
+        except requests.HTTPError:
+            st.error("Failed to load courses")
+            return
         
-        if response.status_code == 200:
-            courses_data = response.json()
-            courses = courses_data.get('courses', [])
+        if courses:
+            # Course selection
+            course_options = {f"{course['title']} (ID: {course['id']})": course['id'] 
+                            for course in courses}
             
-            if courses:
-                # Course selection
-                course_options = {f"{course['title']} (ID: {course['id']})": course['id'] 
-                                for course in courses}
-                
-                selected_course_name = st.selectbox("Select Course:", list(course_options.keys()))
-                selected_course_id = course_options[selected_course_name]
-                
-                # Find selected course info
-                selected_course = next((c for c in courses if c['id'] == selected_course_id), None)
-                
-                # Get course details with lessons
-                course_response = requests.get(f"http://localhost:8000/api/courses/{selected_course_id}")
+            # Warm the detail cache for the first options so switching courses is instant
+            prefetch_course_details(tuple(course_options.values())[:PREFETCH_COURSES])
+            
+            selected_course_name = st.selectbox("Select Course:", list(course_options.keys()))
+            selected_course_id = course_options[selected_course_name]
+            
+            # Find selected course info
+            selected_course = next((c for c in courses if c['id'] == selected_course_id), None)
+            
+            # Get course details with lessons (cached per course)
+            try:
+                course_data = fetch_course_detail(selected_course_id)
+            except requests.HTTPError:
+                course_data = None
+            
+            if course_data is not None:
+                lessons = course_data.get('lessons', [])
                 
-                if course_response.status_code == 200:
-                    course_data = course_response.json()
-                    lessons = course_data.get('lessons', [])
-                    
-                    # Use course title from the courses list
-                    course_title = selected_course['title'] if selected_course else course_data.get('title', 'N/A')
-                    st.write(f"**Course:** {course_title}")
-                    st.write(f"**Total Lessons:** {len(lessons)}")
-
-                    # Add new lesson form
-                    st.markdown("### ➕ Add New Lesson")
-                    with st.form(f"add_lesson_{selected_course_id}"):
-                        new_title = st.text_input("Lesson Title *", placeholder="e.g., Introduction")
-                        new_type = st.selectbox("Type", ["video", "reading", "quiz"], index=0)
-                        new_video_url = st.text_input(
-                            "Video URL (YouTube)",
-                            placeholder="https://www.youtube.com/watch?v=...",
-                            help="Supports: youtube.com/watch?v=ID, youtu.be/ID, youtube.com/embed/ID"
-                        )
-                        new_content = st.text_area(
-                            "Content",
-                            placeholder="Lesson content or description",
-                            height=100
-                        )
-                        new_duration = st.number_input("Duration (minutes)", min_value=0, value=15)
-                        new_is_free = st.checkbox("Free lesson", value=False)
-
-                        if st.form_submit_button("🚀 Create Lesson"):
-                            if not new_title:
-                                st.error("Please enter a lesson title")
-                            else:
-                                try:
-                                    from database.models import get_db
-
-                                    db = get_db()
-                                    conn = db.connect()
-                                    cursor = conn.cursor()
-
-                                    # Determine next lesson order
-                                    existing_orders = [
-                                        l.get('lesson_order') for l in lessons
-                                        if l.get('lesson_order') is not None
-                                    ]
-                                    next_order = max(existing_orders) + 1 if existing_orders else 1
+                # Use course title from the courses list
+                course_title = selected_course['title'] if selected_course else course_data.get('title', 'N/A')
+                st.write(f"**Course:** {course_title}")
+                st.write(f"**Total Lessons:** {len(lessons)}")
+
+                # Add new lesson form
+                st.markdown("### ➕ Add New Lesson")
+                with st.form(f"add_lesson_{selected_course_id}"):
+                    new_title = st.text_input("Lesson Title *", placeholder="e.g., Introduction")
+                    new_type = st.selectbox("Type", ["video", "reading", "quiz"], index=0)
+                    new_video_url = st.text_input(
+                        "Video URL (YouTube)",
+                        placeholder="https://www.youtube.com/watch?v=...",
+                        help="Supports: youtube.com/watch?v=ID, youtu.be/ID, youtube.com/embed/ID"
+                    )
+                    new_content = st.text_area(
+                        "Content",
+                        placeholder="Lesson content or description",
+                        height=100
+                    )
+                    new_duration = st.number_input("Duration (minutes)", min_value=0, value=15)
+                    new_is_free = st.checkbox("Free lesson", value=False)
+
+                    if st.form_submit_button("🚀 Create Lesson"):
+                        if not new_title:
+                            st.error("Please enter a lesson title")
+                        else:
+                            try:
+                                conn = get_db_connection()
+                                cursor = conn.cursor()
+
+                                with get_db_lock(), conn:
+                                    # Determine next lesson order in the same transaction as the insert
+                                    cursor.execute(
+                                        "SELECT COALESCE(MAX(lesson_order), 0) + 1 FROM lessons WHERE course_id = ?",
+                                        (selected_course_id,),
+                                    )
+                                    next_order = cursor.fetchone()[0]
 
                                     cursor.execute(
                                         """
@@ -1070,48 +1517,57 @@ def manage_lessons_tab():
                                             int(new_is_free),
                                         ),
                                     )
-                                    conn.commit()
-                                    st.success("✅ Lesson created successfully!")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"Error creating lesson: {e}")
-
-                    # Display lessons
-                    if lessons:
-                        st.markdown("### 📝 Current Lessons:")
-                        for lesson in lessons:
-                            with st.expander(f"Lesson {lesson.get('lesson_order', '?')}: {lesson.get('title', 'Untitled')}"):
-                                col1, col2 = st.columns([3, 1])
-                                
-                                with col1:
-                                    st.write(f"**Type:** {lesson.get('lesson_type', 'N/A')}")
-                                    st.write(f"**Duration:** {lesson.get('duration_minutes', 0)} minutes")
-                                    st.write(f"**Content:** {lesson.get('content', 'No content')}")
-                                    if lesson.get('video_url'):
-                                        st.write(f"**Video:** {lesson['video_url']}")
-                                    st.write(f"**Free:** {'Yes' if lesson.get('is_free') else 'No'}")
-                                
-                                with col2:
-                                    if st.button(f"✏️ Edit", key=f"edit_lesson_{lesson.get('id')}"):
-                                        st.session_state[f"editing_lesson_{lesson.get('id')}"] = True
-                                
-                                # Edit form
-                                if st.session_state.get(f"editing_lesson_{lesson.get('id')}", False):
-                                    st.markdown("---")
-                                    edit_lesson_form(lesson, selected_course_id)
-                    else:
-                        st.info("No lessons found for this course.")
+                                st.success("✅ Lesson created successfully!")
+                                fetch_course_detail.clear()
+                                fetch_courses.clear()  # lessons_count changed
+                                clear_quiz_caches()
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"Error creating lesson: {e}")
+
+                # Display lessons
+                if lessons:
+                    st.markdown("### 📝 Current Lessons:")
+                    for lesson in lessons:
+                        with st.expander(f"Lesson {lesson.get('lesson_order', '?')}: {lesson.get('title', 'Untitled')}"):
+                            col1, col2 = st.columns([3, 1])
+                            
+                            with col1:
+                                st.write(f"**Type:** {lesson.get('lesson_type', 'N/A')}")
+                                st.write(f"**Duration:** {lesson.get('duration_minutes', 0)} minutes")
+                                st.write(f"**Content:** {lesson.get('content', 'No content')}")
+                                if lesson.get('video_url'):
+                                    st.write(f"**Video:** {lesson['video_url']}")
+                                st.write(f"**Free:** {'Yes' if lesson.get('is_free') else 'No'}")
+                            
+                            with col2:
+                                if st.button(f"✏️ Edit", key=f"edit_lesson_{lesson.get('id')}"):
+                                    admin_ui_state()['editing_lesson'].add(lesson.get('id'))
+                            
+                            # Edit form
+                            if lesson.get('id') in admin_ui_state()['editing_lesson']:
+                                st.markdown("---")
+                                edit_lesson_form(lesson, selected_course_id)
                 else:
-                    st.error("Failed to load course details")
+                    st.info("No lessons found for this course.")
             else:
-                st.info("No courses available.")
+                st.error("Failed to load course details")
         else:
-            st.error("Failed to load courses")
+            st.info("No courses available.")
             
     except Exception as e:
         st.error(f"Error: {e}")
 
 
+_YOUTUBE_ID_RE = re.compile(r"(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([A-Za-z0-9_-]{11})")
+
+
+def youtube_video_id(url):
+    """Extract the video ID from a watch, youtu.be or embed URL, or None."""
+    match = _YOUTUBE_ID_RE.search(url or "")
+    return match.group(1) if match else None
+
+
 def edit_lesson_form(lesson, course_id):
     """Edit lesson form with video URL and content."""
     st.subheader(f"✏️ Edit Lesson: {lesson.get('title', 'Untitled')}")
@@ -1123,16 +1579,11 @@ def edit_lesson_form(lesson, course_id):
                                   help="Supports: youtube.com/watch?v=ID, youtu.be/ID, youtube.com/embed/ID")
         
         # Show current video preview if URL exists
+        video_id = None
         if lesson.get('video_url'):
             st.write("**Current Video:**")
-            video_id = None
             url = lesson.get('video_url', '')
-            if 'youtube.com/watch?v=' in url:
-                video_id = url.split('v=')[1].split('&')[0]
-            elif 'youtu.be/' in url:
-                video_id = url.split('youtu.be/')[1].split('?')[0]
-            elif 'youtube.com/embed/' in url:
-                video_id = url.split('embed/')[1].split('?')[0]
+            video_id = youtube_video_id(url)
             
             if video_id:
                 st.video(f"https://www.youtube.com/watch?v={video_id}")
@@ -1141,21 +1592,15 @@ def edit_lesson_form(lesson, course_id):
         
         st.write("**Preview New URL:**")
         if video_url and video_url != lesson.get('video_url', ''):
-            try:
-                new_video_id = None
-                if 'youtube.com/watch?v=' in video_url:
-                    new_video_id = video_url.split('v=')[1].split('&')[0]
-                elif 'youtu.be/' in video_url:
-                    new_video_id = video_url.split('youtu.be/')[1].split('?')[0]
-                elif 'youtube.com/embed/' in video_url:
-                    new_video_id = video_url.split('embed/')[1].split('?')[0]
-                
-                if new_video_id:
-                    st.video(f"https://www.youtube.com/watch?v={new_video_id}")
-                else:
-                    st.warning("Invalid YouTube URL format")
-            except:
-                st.warning("Could not preview video")
+            new_video_id = youtube_video_id(video_url)
+            
+            if new_video_id and new_video_id == video_id:
+                # Same video with different URL parameters; the player above already shows it
+                st.caption("Same video as the current one")
+            elif new_video_id:
+                st.video(f"https://www.youtube.com/watch?v={new_video_id}")
+            else:
+                st.warning("Invalid YouTube URL format")
         duration_minutes = st.number_input("Duration (minutes)", value=lesson.get('duration_minutes', 0), min_value=0)
         lesson_type = st.selectbox("Type", ["video", "reading", "quiz"], 
                                   index=["video", "reading", "quiz"].index(lesson.get('lesson_type', 'video')))
@@ -1166,24 +1611,22 @@ def edit_lesson_form(lesson, course_id):
             if st.form_submit_button("💾 Save Changes"):
                 try:
                     # Update lesson via database (since we don't have lesson API endpoint)
-                    from database.models import get_db
-                    
-                    db = get_db()
-                    conn = db.connect()
+                    conn = get_db_connection()
                     cursor = conn.cursor()
                     
-                    cursor.execute("""
-                        UPDATE lessons 
-                        SET title = ?, content = ?, video_url = ?, 
-                            duration_minutes = ?, lesson_type = ?, is_free = ?
-                        WHERE id = ?
-                    """, (title, content, video_url, duration_minutes, lesson_type, is_free, lesson.get('id')))
-                    
-                    conn.commit()
+                    with get_db_lock(), conn:
+                        cursor.execute("""
+                            UPDATE lessons 
+                            SET title = ?, content = ?, video_url = ?, 
+                                duration_minutes = ?, lesson_type = ?, is_free = ?
+                            WHERE id = ?
+                        """, (title, content, video_url, duration_minutes, lesson_type, is_free, lesson.get('id')))
                     
                     if cursor.rowcount > 0:
                         st.success("✅ Lesson updated successfully!")
-                        st.session_state[f"editing_lesson_{lesson.get('id')}"] = False
+                        fetch_course_detail.clear()
+                        clear_quiz_caches()
+                        admin_ui_state()['editing_lesson'].discard(lesson.get('id'))
                         st.rerun()
                     else:
                         st.error("❌ Failed to update lesson")
@@ -1193,7 +1636,7 @@ def edit_lesson_form(lesson, course_id):
         
         with col2:
             if st.form_submit_button("❌ Cancel"):
-                st.session_state[f"editing_lesson_{lesson.get('id')}"] = False
+                admin_ui_state()['editing_lesson'].discard(lesson.get('id'))
                 st.rerun()
 
 
@@ -10,55 +10,186 @@ import plotly.express as px
 import plotly.graph_objects as go
 import json
 import os
-from pathlib import Path
 from datetime import datetime
 
 
+def _latest(prefix, suffix):
+    """Return (path, mtime) of the most recent results file named prefix*suffix, or None."""
+    best, best_ctime = None, None
+    try:
+        with os.scandir("results") as entries:
+            # One stat per entry, reused for both the ctime comparison and the cache key
+            for entry in entries:
+                if entry.name.startswith(prefix) and entry.name.endswith(suffix):
+                    stat = entry.stat()
+                    if best is None or stat.st_ctime > best_ctime:
+                        best, best_ctime, best_mtime = entry.path, stat.st_ctime, stat.st_mtime
+    except FileNotFoundError:
+        return None
+    
+    if best is None:
+        return None
+    return best, best_mtime
+
+
+@st.cache_data(show_spinner=False)
+def _load_csv(path: str, mtime: float):
+    """Parse a results CSV; mtime is part of the cache key so rewrites are re-read."""
+    return pd.read_csv(path)
+
+
+@st.cache_data(show_spinner=False)
+def _load_json(path: str, mtime: float):
+    """Parse a results JSON; mtime is part of the cache key so rewrites are re-read."""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
 def load_predictive_results():
     """Load predictive model benchmark results."""
-    results_dir = Path("results")
-    csv_files = list(results_dir.glob("predictive_benchmark_*.csv"))
-    
-    if not csv_files:
+    latest = _latest("predictive_benchmark_", ".csv")
+    if latest is None:
         return None
-    
-    # Get most recent file
-    latest_file = max(csv_files, key=os.path.getctime)
-    df = pd.read_csv(latest_file)
-    
-    return df, latest_file.name
+    return _load_csv(*latest), os.path.basename(latest[0])
 
 
 def load_rag_results():
     """Load RAG system benchmark results."""
-    results_dir = Path("results")
-    json_files = list(results_dir.glob("rag_benchmark_*.json"))
-    
-    if not json_files:
+    latest = _latest("rag_benchmark_", ".json")
+    if latest is None:
         return None
-    
-    # Get most recent file
-    latest_file = max(json_files, key=os.path.getctime)
-    with open(latest_file, 'r') as f:
-        data = json.load(f)
-    
-    return data, latest_file.name
+    return _load_json(*latest), os.path.basename(latest[0])
 
 
 def load_llm_results():
     """Load LLM advice benchmark results."""
-    results_dir = Path("results")
-    json_files = list(results_dir.glob("llm_benchmark_*.json"))
-    
-    if not json_files:
+    latest = _latest("llm_benchmark_", ".json")
+    if latest is None:
         return None
+    return _load_json(*latest), os.path.basename(latest[0])
+
+
+@st.cache_resource(show_spinner=False)
+def predictive_figures(df):
+    """Build the predictive benchmark charts once per results table."""
+    auc_fig = px.bar(df, x='model', y='test_auc', 
+                     title='Test AUC by Model',
+                     labels={'model': 'Model', 'test_auc': 'AUC'},
+                     color='test_auc',
+                     color_continuous_scale='Viridis')
+    auc_fig.update_layout(showlegend=False, height=400)
+    
+    f1_fig = px.bar(df, x='model', y='test_f1',
+                    title='Test F1-Score by Model',
+                    labels={'model': 'Model', 'test_f1': 'F1-Score'},
+                    color='test_f1',
+                    color_continuous_scale='Blues')
+    f1_fig.update_layout(showlegend=False, height=400)
+    
+    # Prepare data for radar chart
+    metrics = ['test_auc', 'test_f1', 'test_precision', 'test_recall', 'test_accuracy']
+    metric_labels = ['AUC', 'F1', 'Precision', 'Recall', 'Accuracy']
+    
+    radar_fig = go.Figure()
+    
+    for values, name in zip(df[metrics].to_numpy(), df['model'].to_numpy()):
+        radar_fig.add_trace(go.Scatterpolar(
+            r=values.tolist(),
+            theta=metric_labels,
+            fill='toself',
+            name=name
+        ))
+    
+    radar_fig.update_layout(
+        polar=dict(radialaxis=dict(visible=True, range=[0, 1])),
+        showlegend=True,
+        height=500
+    )
     
-    # Get most recent file
-    latest_file = max(json_files, key=os.path.getctime)
-    with open(latest_file, 'r') as f:
-        data = json.load(f)
+    time_fig = px.bar(df.sort_values('train_time'), 
+                      x='model', y='train_time',
+                      title='Training Time by Model',
+                      labels={'model': 'Model', 'train_time': 'Time (seconds)'},
+                      color='train_time',
+                      color_continuous_scale='Reds')
+    time_fig.update_layout(showlegend=False, height=400)
     
-    return data, latest_file.name
+    return auc_fig, f1_fig, radar_fig, time_fig
+
+
+@st.cache_resource(show_spinner=False)
+def retrieval_figures(retrieval_by_category):
+    """Build the RAG retrieval charts once per per-category summary."""
+    relevance_fig = px.bar(retrieval_by_category, x='category', y='relevance_score',
+                           title='Retrieval Relevance by Question Category',
+                           labels={'category': 'Category', 'relevance_score': 'Relevance Score'},
+                           color='relevance_score',
+                           color_continuous_scale='Greens')
+    relevance_fig.update_layout(showlegend=False, height=400)
+    relevance_fig.update_xaxes(tickangle=45)
+    
+    time_fig = px.bar(retrieval_by_category, x='category', y='retrieval_time',
+                      title='Retrieval Time by Category',
+                      labels={'category': 'Category', 'retrieval_time': 'Time (s)'},
+                      color='retrieval_time',
+                      color_continuous_scale='Blues')
+    time_fig.update_layout(showlegend=False, height=400)
+    time_fig.update_xaxes(tickangle=45)
+    
+    return relevance_fig, time_fig
+
+
+@st.cache_resource(show_spinner=False)
+def response_quality_figures(df_quality):
+    """Build the RAG response quality charts once per scores table."""
+    hist_fig = px.histogram(df_quality, x='quality_score',
+                            title='Distribution of Quality Scores',
+                            labels={'quality_score': 'Quality Score'},
+                            nbins=10)
+    hist_fig.update_layout(height=400)
+    
+    response_by_category = df_quality.groupby('category', as_index=False, sort=False)['response_time'].mean()
+    time_fig = px.bar(response_by_category, x='category', y='response_time',
+                      title='Response Generation Time',
+                      labels={'category': 'Category', 'response_time': 'Time (s)'},
+                      color='response_time',
+                      color_continuous_scale='Oranges')
+    time_fig.update_layout(showlegend=False, height=400)
+    time_fig.update_xaxes(tickangle=45)
+    
+    return hist_fig, time_fig
+
+
+@st.cache_resource(show_spinner=False)
+def advice_quality_figures(df_quality):
+    """Build the LLM advice quality charts once per scores table."""
+    risk_quality = df_quality.groupby('risk_level')['overall_quality'].mean().reset_index()
+    risk_fig = px.bar(risk_quality, x='risk_level', y='overall_quality',
+                      title='Average Quality Score by Risk Level',
+                      labels={'risk_level': 'Risk Level', 'overall_quality': 'Quality Score'},
+                      color='overall_quality',
+                      color_continuous_scale='Viridis')
+    risk_fig.update_layout(showlegend=False, height=400)
+    
+    components = df_quality[['has_specific_numbers', 'has_actionable_steps', 
+                            'mentions_engagement', 'mentions_grades', 
+                            'is_personalized', 'has_encouragement']].mean()
+    components_fig = px.bar(x=components.values, y=components.index, orientation='h',
+                            title='Percentage of Advice Meeting Criteria',
+                            labels={'x': 'Percentage', 'y': 'Criteria'})
+    components_fig.update_layout(height=400)
+    
+    return risk_fig, components_fig
+
+
+@st.cache_resource(show_spinner=False)
+def response_time_histogram(response_times: tuple):
+    """Build the LLM response time histogram once per set of timings."""
+    fig = px.histogram(x=list(response_times), nbins=15,
+                       title='Distribution of Response Times',
+                       labels={'x': 'Response Time (s)', 'y': 'Count'})
+    fig.update_layout(height=400)
+    return fig
 
 
 def show_predictive_dashboard(df, filename):
@@ -102,64 +233,27 @@ def show_predictive_dashboard(df, filename):
         hide_index=True
     )
     
+    # Charts are built once per results file and reused across reruns
+    auc_fig, f1_fig, radar_fig, time_fig = predictive_figures(df)
+    
     # Performance comparison chart
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("AUC Comparison")
-        fig = px.bar(df, x='model', y='test_auc', 
-                     title='Test AUC by Model',
-                     labels={'model': 'Model', 'test_auc': 'AUC'},
-                     color='test_auc',
-                     color_continuous_scale='Viridis')
-        fig.update_layout(showlegend=False, height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(auc_fig, use_container_width=True)
     
     with col2:
         st.subheader("F1-Score Comparison")
-        fig = px.bar(df, x='model', y='test_f1',
-                     title='Test F1-Score by Model',
-                     labels={'model': 'Model', 'test_f1': 'F1-Score'},
-                     color='test_f1',
-                     color_continuous_scale='Blues')
-        fig.update_layout(showlegend=False, height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(f1_fig, use_container_width=True)
     
     # Metrics radar chart
     st.subheader("Multi-Metric Comparison")
-    
-    # Prepare data for radar chart
-    metrics = ['test_auc', 'test_f1', 'test_precision', 'test_recall', 'test_accuracy']
-    metric_labels = ['AUC', 'F1', 'Precision', 'Recall', 'Accuracy']
-    
-    fig = go.Figure()
-    
-    for idx, row in df.iterrows():
-        fig.add_trace(go.Scatterpolar(
-            r=[row[m] for m in metrics],
-            theta=metric_labels,
-            fill='toself',
-            name=row['model']
-        ))
-    
-    fig.update_layout(
-        polar=dict(radialaxis=dict(visible=True, range=[0, 1])),
-        showlegend=True,
-        height=500
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(radar_fig, use_container_width=True)
     
     # Training time comparison
     st.subheader("Training Time Comparison")
-    fig = px.bar(df.sort_values('train_time'), 
-                 x='model', y='train_time',
-                 title='Training Time by Model',
-                 labels={'model': 'Model', 'train_time': 'Time (seconds)'},
-                 color='train_time',
-                 color_continuous_scale='Reds')
-    fig.update_layout(showlegend=False, height=400)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(time_fig, use_container_width=True)
 
 
 def show_rag_dashboard(data, filename):
@@ -187,30 +281,21 @@ def show_rag_dashboard(data, filename):
         
         retrieval_scores = data['retrieval']['scores']
         df_retrieval = pd.DataFrame(retrieval_scores)
+        # One bar per category: aggregate here so only the means are sent to the browser
+        retrieval_by_category = df_retrieval.groupby('category', as_index=False, sort=False)[
+            ['relevance_score', 'retrieval_time']].mean()
+        
+        relevance_fig, time_fig = retrieval_figures(retrieval_by_category)
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.write("**Relevance by Category**")
-            fig = px.bar(df_retrieval, x='category', y='relevance_score',
-                        title='Retrieval Relevance by Question Category',
-                        labels={'category': 'Category', 'relevance_score': 'Relevance Score'},
-                        color='relevance_score',
-                        color_continuous_scale='Greens')
-            fig.update_layout(showlegend=False, height=400)
-            fig.update_xaxes(tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(relevance_fig, use_container_width=True)
         
         with col2:
             st.write("**Retrieval Time**")
-            fig = px.bar(df_retrieval, x='category', y='retrieval_time',
-                        title='Retrieval Time by Category',
-                        labels={'category': 'Category', 'retrieval_time': 'Time (s)'},
-                        color='retrieval_time',
-                        color_continuous_scale='Blues')
-            fig.update_layout(showlegend=False, height=400)
-            fig.update_xaxes(tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(time_fig, use_container_width=True)
         
         # Detailed table
         with st.expander("View Detailed Results"):
@@ -222,28 +307,17 @@ def show_rag_dashboard(data, filename):
         
         quality_scores = data['response_quality']['scores']
         df_quality = pd.DataFrame(quality_scores)
+        hist_fig, time_fig = response_quality_figures(df_quality)
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.write("**Quality Score Distribution**")
-            fig = px.histogram(df_quality, x='quality_score',
-                             title='Distribution of Quality Scores',
-                             labels={'quality_score': 'Quality Score'},
-                             nbins=10)
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(hist_fig, use_container_width=True)
         
         with col2:
             st.write("**Response Time by Category**")
-            fig = px.bar(df_quality, x='category', y='response_time',
-                        title='Response Generation Time',
-                        labels={'category': 'Category', 'response_time': 'Time (s)'},
-                        color='response_time',
-                        color_continuous_scale='Oranges')
-            fig.update_layout(showlegend=False, height=400)
-            fig.update_xaxes(tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(time_fig, use_container_width=True)
 
 
 def show_llm_dashboard(data, filename):
@@ -273,31 +347,17 @@ def show_llm_dashboard(data, filename):
         
         quality_scores = data['quality']['quality_scores']
         df_quality = pd.DataFrame(quality_scores)
+        risk_fig, components_fig = advice_quality_figures(df_quality)
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.write("**Overall Quality by Risk Level**")
-            risk_quality = df_quality.groupby('risk_level')['overall_quality'].mean().reset_index()
-            fig = px.bar(risk_quality, x='risk_level', y='overall_quality',
-                        title='Average Quality Score by Risk Level',
-                        labels={'risk_level': 'Risk Level', 'overall_quality': 'Quality Score'},
-                        color='overall_quality',
-                        color_continuous_scale='Viridis')
-            fig.update_layout(showlegend=False, height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(risk_fig, use_container_width=True)
         
         with col2:
             st.write("**Quality Components**")
-            components = df_quality[['has_specific_numbers', 'has_actionable_steps', 
-                                    'mentions_engagement', 'mentions_grades', 
-                                    'is_personalized', 'has_encouragement']].mean()
-            
-            fig = px.bar(x=components.values, y=components.index, orientation='h',
-                        title='Percentage of Advice Meeting Criteria',
-                        labels={'x': 'Percentage', 'y': 'Criteria'})
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(components_fig, use_container_width=True)
         
         # Detailed table
         with st.expander("View Detailed Quality Scores"):
@@ -313,11 +373,7 @@ def show_llm_dashboard(data, filename):
         
         with col1:
             st.write("**Response Time Distribution**")
-            fig = px.histogram(x=response_times, nbins=15,
-                             title='Distribution of Response Times',
-                             labels={'x': 'Response Time (s)', 'y': 'Count'})
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(response_time_histogram(tuple(response_times)), use_container_width=True)
         
         with col2:
             st.write("**Response Time Statistics**")
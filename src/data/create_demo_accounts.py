@@ -6,6 +6,7 @@ including at-risk students so users can test the chatbot and personalized advice
 """
 
 import pandas as pd
+import csv
 import sys
 import os
 from pathlib import Path
@@ -22,11 +23,7 @@ def create_demo_accounts():
     print("CREATING DEMO ACCOUNTS FOR STUDENT PORTAL")
     print("="*70)
     
-    db = get_db()
-    conn = db.connect()
-    conn.execute("PRAGMA journal_mode=DELETE;")  # Disable WAL mode
-    conn.commit()
-    conn.close()
+    db = get_db()  # WAL + synchronous=NORMAL are set up by the Database itself
     
     # Check if predictions exist
     predictions_file = "data/processed/student_predictions.csv"
@@ -64,8 +61,18 @@ def create_demo_accounts():
     print()
     
     created = []
+    new_accounts = []
     
-    for idx, row in demo_students.iterrows():
+    records = demo_students.to_dict('records')
+    
+    # One lookup for every candidate instead of a login attempt per student
+    try:
+        existing_emails = db.get_existing_emails([f"student{int(r['id_student'])}@ou.ac.uk" for r in records])
+    except Exception as e:
+        print(f"   ✗ Error checking existing accounts: {e}")
+        return
+    
+    for row in records:
         student_id = int(row['id_student'])
         is_at_risk = int(row['is_at_risk'])
         risk_prob = float(row['risk_probability'])
@@ -73,51 +80,50 @@ def create_demo_accounts():
         # Create account details
         email = f"student{student_id}@ou.ac.uk"
         password = "demo123"  # Simple password for demo
-        first_name = f"Student{student_id}"
-        last_name = "Demo"
         
-        try:
-            # Check if account already exists
-            existing = db.authenticate_student(email, password)
-            
-            if existing:
-                print(f"   ✓ Student {student_id} already has account")
-            else:
-                # Create new account
-                new_id = db.create_student(
-                    email=email,
-                    password=password,
-                    first_name=first_name,
-                    last_name=last_name,
-                    code_module=row.get('code_module', 'AAA'),
-                    code_presentation=row.get('code_presentation', '2013J'),
-                    gender=row.get('gender', 'M'),
-                    region=row.get('region', 'Unknown'),
-                    highest_education=row.get('highest_education', 'Unknown'),
-                    imd_band=str(row.get('imd_band', '10-20%')),
-                    age_band=row.get('age_band', '35-55'),
-                    disability=row.get('disability', 'N')
-                )
-                
-                if new_id:
-                    # Update risk prediction
-                    db.update_student_risk(new_id, is_at_risk, risk_prob)
-                    print(f"   ✓ Created: Student {student_id} ({'AT-RISK' if is_at_risk else 'SAFE'})")
-                else:
-                    print(f"   ✗ Failed: Student {student_id}")
-                    continue
-            
-            # Add to created list
-            created.append({
-                'student_id': student_id,
+        # Summary row (printed and saved once the account exists)
+        account = {
+            'student_id': student_id,
+            'email': email,
+            'password': password,
+            'is_at_risk': is_at_risk,
+            'risk_probability': f"{risk_prob*100:.1f}%"
+        }
+        
+        if email in existing_emails:
+            print(f"   ✓ Student {student_id} already has account")
+            created.append(account)
+        else:
+            new_accounts.append((account, {
                 'email': email,
                 'password': password,
+                'first_name': f"Student{student_id}",
+                'last_name': "Demo",
+                'code_module': row.get('code_module', 'AAA'),
+                'code_presentation': row.get('code_presentation', '2013J'),
+                'gender': row.get('gender', 'M'),
+                'region': row.get('region', 'Unknown'),
+                'highest_education': row.get('highest_education', 'Unknown'),
+                'imd_band': str(row.get('imd_band', '10-20%')),
+                'age_band': row.get('age_band', '35-55'),
+                'disability': row.get('disability', 'N'),
                 'is_at_risk': is_at_risk,
-                'risk_probability': f"{risk_prob*100:.1f}%"
-            })
-            
-        except Exception as e:
-            print(f"   ✗ Error for student {student_id}: {e}")
+                'risk_probability': risk_prob
+            }))
+    
+    # Insert every new account (with its risk prediction) in a single transaction
+    try:
+        new_ids = db.create_students([student for _, student in new_accounts])
+    except Exception as e:
+        print(f"   ✗ Error creating accounts: {e}")
+        new_ids = {}
+    
+    for account, _ in new_accounts:
+        if account['email'] in new_ids:
+            print(f"   ✓ Created: Student {account['student_id']} ({'AT-RISK' if account['is_at_risk'] else 'SAFE'})")
+            created.append(account)
+        else:
+            print(f"   ✗ Failed: Student {account['student_id']}")
     
     # Print summary
     print()
@@ -149,7 +155,10 @@ def create_demo_accounts():
     
     # Save to file
     output_file = "data/demo_accounts.csv"
-    pd.DataFrame(created).to_csv(output_file, index=False)
+    with open(output_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['student_id', 'email', 'password', 'is_at_risk', 'risk_probability'])
+        writer.writeheader()
+        writer.writerows(created)
     print(f"Account list saved to: {output_file}")
     print()
 
@@ -28,11 +28,15 @@ class Database:
         """Create database connection."""
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row  # Return dict-like rows
+        # Safe with WAL: commits skip the per-transaction fsync of the default FULL mode
+        self.conn.execute("PRAGMA synchronous=NORMAL")
         return self.conn
     
     def setup_database(self):
         """Create all tables if they don't exist."""
         conn = self.connect()
+        # WAL is persistent in the database file, so every later connection uses it
+        conn.execute("PRAGMA journal_mode=WAL")
         cursor = conn.cursor()
         
         # Students table
@@ -371,6 +375,11 @@ class Database:
             )
         """)
         
+        # Covering index: DISTINCT code_module reads the index in order, not the table
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_code_module ON students(code_module)")
+        # Lets the admin course list count lessons per course without scanning the table
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_lessons_course_id ON lessons(course_id)")
+        
         conn.commit()
         logger.info("Database tables created successfully")
     
@@ -414,6 +423,57 @@ class Database:
             logger.error(f"Email already exists: {email}")
             return None
     
+    def create_students(self, students: List[Dict]) -> Dict[str, int]:
+        """Create several student accounts, with their risk predictions, in one transaction.
+        
+        Each dict carries email, password and the create_student fields, plus optional
+        is_at_risk / risk_probability. Returns {email: id_student} for the rows inserted;
+        emails that already exist are skipped.
+        """
+        conn = self.connect()
+        created = {}
+        
+        with conn:
+            for student in students:
+                try:
+                    cursor = conn.execute("""
+                        INSERT INTO students (email, password_hash, first_name, last_name,
+                                            code_module, code_presentation, gender, region,
+                                            highest_education, imd_band, age_band, disability,
+                                            is_at_risk, risk_probability)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        student['email'], self.hash_password(student['password']),
+                        student.get('first_name', ''),
+                        student.get('last_name', ''),
+                        student.get('code_module', ''),
+                        student.get('code_presentation', ''),
+                        student.get('gender', ''),
+                        student.get('region', ''),
+                        student.get('highest_education', ''),
+                        student.get('imd_band', ''),
+                        student.get('age_band', ''),
+                        student.get('disability', ''),
+                        student.get('is_at_risk', 0),
+                        student.get('risk_probability', 0.0)
+                    ))
+                except sqlite3.IntegrityError:
+                    logger.error(f"Email already exists: {student['email']}")
+                    continue
+                created[student['email']] = cursor.lastrowid
+        
+        logger.info(f"Created {len(created)} students in one transaction")
+        return created
+    
+    def get_existing_emails(self, emails: List[str]) -> set:
+        """Return the subset of emails that already have a student account."""
+        if not emails:
+            return set()
+        conn = self.connect()
+        placeholders = ','.join('?' * len(emails))
+        rows = conn.execute(f"SELECT email FROM students WHERE email IN ({placeholders})", list(emails))
+        return {row['email'] for row in rows}
+    
     def authenticate_student(self, email: str, password: str) -> Optional[Dict]:
         """Authenticate student login."""
         conn = self.connect()
@@ -21,7 +21,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.models import get_db
-from chatbot.rag_system import initialize_knowledge_base
+from chatbot.rag_system import get_rag_system
 
 # Page config
 st.set_page_config(
@@ -404,7 +404,7 @@ def materials_page():
         if st.session_state.rag_system is None:
             with st.spinner("Loading AI..."):
                 try:
-                    st.session_state.rag_system = initialize_knowledge_base()
+                    st.session_state.rag_system = get_rag_system()
                 except Exception as e:
                     st.error(f"AI unavailable: {e}")
                     return
@@ -513,7 +513,7 @@ def chatbot_page():
     if st.session_state.rag_system is None:
         with st.spinner("Initializing AI Advisor..."):
             try:
-                st.session_state.rag_system = initialize_knowledge_base()
+                st.session_state.rag_system = get_rag_system()
                 st.success("AI Advisor ready!")
             except Exception as e:
                 st.error(f"Failed to initialize AI: {e}")
@@ -0,0 +1,32 @@
+"""
+Tests for the streamed interventions payload of the LMS API.
+"""
+
+import json
+import logging
+import sqlite3
+
+from src.api.main import _stream_interventions
+
+
+class _FailingCursor:
+    """Cursor stand-in that yields one row and then fails like a broken database."""
+
+    def __iter__(self):
+        yield {"id": 1, "student_id": 42, "intervention_type": "email"}
+        raise sqlite3.OperationalError("disk I/O error")
+
+
+def test_stream_closes_json_and_logs_on_database_error(caplog):
+    with caplog.at_level(logging.ERROR, logger="src.api.main"):
+        body = b"".join(_stream_interventions(_FailingCursor()))
+
+    payload = json.loads(body)
+    assert payload["interventions"] == [{"id": 1, "student_id": 42, "intervention_type": "email"}]
+    assert payload["error"] == "disk I/O error"
+    assert "Interventions stream aborted" in caplog.text
+
+
+def test_stream_without_errors_is_plain_list():
+    rows = [{"id": 1}, {"id": 2}]
+    assert json.loads(b"".join(_stream_interventions(iter(rows)))) == {"interventions": rows}
@@ -0,0 +1,42 @@
+"""
+AppTest checks for the dashboard's Student List page.
+"""
+
+import os
+
+from streamlit.testing.v1 import AppTest
+
+DASHBOARD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "dashboard")
+
+SCRIPT = f"""
+import sys
+sys.path.insert(0, {DASHBOARD_DIR!r})
+
+import numpy as np
+import pandas as pd
+import app
+
+ids = np.arange(10000, 10300)
+data = pd.DataFrame({{
+    'id_student': ids,
+    'code_module': ['AAA', 'BBB', 'CCC'] * 100,
+    'is_at_risk': [0, 1] * 150,
+    'risk_probability': np.linspace(0, 1, len(ids)),
+}})
+data['_id_str'] = data['id_student'].astype(str)
+
+app.load_data = lambda: data
+app.student_list_page(data, app.load_lookups())
+"""
+
+
+def test_one_character_search_filters_student_selectbox():
+    at = AppTest.from_string(SCRIPT, default_timeout=30).run()
+    assert not at.exception
+
+    at.text_input[0].input("7").run()
+    assert not at.exception
+
+    expected = [str(i) for i in range(10000, 10300) if "7" in str(i)]
+    assert [str(option) for option in at.selectbox[2].options] == expected
+    assert at.markdown[0].value.startswith(f"Showing {len(expected)} students")